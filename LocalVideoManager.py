@@ -1,17 +1,66 @@
 import os
 import subprocess
 import tkinter as tk
-from tkinter import filedialog, messagebox, ttk, colorchooser
-from PIL import Image, ImageTk
+from tkinter import filedialog, messagebox, ttk, colorchooser, simpledialog
 import re
 import copy
 import tkinter.font as tkfont
 import random
 from datetime import datetime
-from collections import Counter, defaultdict
+from collections import Counter, OrderedDict, defaultdict, deque
 import threading
 import io
 import ctypes
+import sys
+import json
+import hashlib
+import heapq
+import mmap
+import struct
+import sqlite3
+import tempfile
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+import fnmatch
+import functools
+import difflib
+import importlib
+import importlib.util
+from operator import itemgetter
+
+try:
+    from watchdog.observers import Observer  # 可选：pip install watchdog
+except ImportError:
+    Observer = None  # 未安装时用轮询监视目录变化
+import time
+
+START_TIME = time.perf_counter()  # 用于统计启动到显示首个瓦片的耗时
+
+
+class LazyModule:
+    """首次访问属性时才导入模块，用于推迟 Pillow 等较慢的导入，直到真正需要封面时。"""
+
+    def __init__(self, name):
+        self.name = name
+        self.module = None
+
+    def __getattr__(self, attr):
+        if self.module is None:
+            self.module = importlib.import_module(self.name)
+        return getattr(self.module, attr)
+
+
+Image = LazyModule("PIL.Image")
+ImageTk = LazyModule("PIL.ImageTk")
+# 可选：pip install numpy，用于按列排序；同样推迟到首次使用时导入
+NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None
+np = LazyModule("numpy")
 
 # 注意：这个脚本需要安装 Pillow 库（pip install pillow）。
 # PotPlayer 的路径需要根据你的安装位置调整，如果 PotPlayer 已添加到 PATH，可以直接用 'PotPlayerMini64.exe' 或类似。
@@ -23,6 +72,1730 @@ import ctypes
 
 POTPLAYER_PATH = r"D:\APP\PotPlayer\PotPlayerMini64.exe"  # 替换为你的 PotPlayer 路径
 VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov", ".wmv")  # 支持的视频格式
+COVER_EXTENSIONS = (".jpg", ".png", ".jpeg", ".webp")  # 封面格式，同名时靠前的优先
+FILE_ATTRIBUTE_HIDDEN = 0x2  # Windows 隐藏文件属性
+APP_DIR = os.path.dirname(os.path.abspath(sys.argv[0]))
+CONFIG_PATH = os.path.join(APP_DIR, "config.json")
+DEFAULT_CONFIG = {
+    "thumb_cache_mb": 512,  # 磁盘缩略图缓存上限（MB）
+    "thumb_workers": 4,  # 封面解码线程数
+    "thumb_queue_depth": 256,  # 排队中的封面解码任务上限，超出的远离视口的任务暂存
+    "photo_cache_mb": 256,  # 已解码缩略图的内存缓存上限（MB）
+    "thumb_quality": "balanced",  # 封面缩放质量：fast / balanced / quality
+    "thumb_pack": False,  # 缩略图缓存使用单个打包文件 + mmap 读取
+    "decode_backend": "thread",  # 封面解码方式：thread（线程内）/ process（进程池）
+    "watch_library": True,  # 自动监视视频目录的变化
+    "watch_poll_seconds": 10,  # 无法使用系统文件通知时的轮询间隔（秒）
+    "scan_workers": 8,  # 扫描目录的并发数，网络共享上可调高
+    "scan_exclude": [],  # 扫描时跳过的目录（通配符，匹配目录名或相对路径）
+    "last_session": None,  # 上次关闭时的目录、筛选、排序、尺寸和滚动位置
+    "saved_queries": {},  # 保存的查询：名称 -> 查询文本
+}
+DECODE_BACKENDS = {"thread": "线程", "process": "进程池"}
+# 封面缩放质量 -> (显示名称, draft/reduce 后保留的目标尺寸倍数, 最终缩放滤镜名)
+THUMB_QUALITIES = {
+    "fast": ("快速", 1, "BILINEAR"),
+    "balanced": ("均衡", 2, "BICUBIC"),
+    "quality": ("高质量", 3, "LANCZOS"),
+}
+BAD_IMAGE = object()  # 缓存中标记损坏封面的哨兵值
+TILE_GAP = 5  # 瓦片内边距与间隙
+GRID_SIZES = tuple(range(350, 701, 50))  # 网格尺寸滑块的所有取值
+PREVIEW_SIZE = (16, 11)  # 封面低清预览图的最大尺寸
+PREFETCH_INTERVAL = 120  # 预取检查间隔（毫秒）
+PREFETCH_IDLE_STOP = 0.4  # 停止滚动超过该秒数后不再预取
+PREFETCH_LOOKAHEAD = 1.5  # 按当前速度预取未来多少秒会滚到的行
+PREFETCH_MAX_ROWS = 8
+UI_TICK_MS = 30  # 主循环处理后台结果的间隔（毫秒）
+UI_TICK_BUDGET_MS = 12  # 每轮处理后台结果的时间预算（毫秒），超出的留到下一轮
+SNAPSHOT_MAX_TILES = 240  # 首屏快照最多保存的瓦片数，超出时启动后回到顶部
+SEARCH_SEPARATOR = "\0"  # 拼接各搜索字段的分隔符（无法从搜索框输入）
+SEARCH_DEBOUNCE_MS = 150  # 输入停止该毫秒数后才执行实时搜索
+SEARCH_SETTLE_MS = 600  # 实时搜索后输入停顿该毫秒数，再补全首屏以外的结果
+FUZZY_TOP_K = 60  # 模糊搜索返回的结果数
+# 特征码 ABC-123 拆成 abc 和 123，这样 abc123、abc 123 也能匹配
+FUZZY_WORD_REGEX = re.compile(r"[^\W\d_]+|\d+")
+FUZZY_TERMS = 64  # 每个查询词最多考虑的相近词数
+FUZZY_MIN_SCORE = 0.34  # 二元组重合比例和相似度的下限
+FUZZY_COMMON = 5000  # 命中视频数超过此值的查询词不再单独产生候选
+PARSE_CACHE_SIZE = 1 << 18  # 文件名解析结果的缓存条目数
+QUERY_CACHE_SIZE = 256  # 已解析查询的缓存条目数
+# 可按列排序的选项 -> (列名, 是否降序)
+COLUMN_SORTS = {
+    "星级降序": ("rating", True),
+    "星级升序": ("rating", False),
+    "演员数量降序": ("actors", True),
+    "演员数量升序": ("actors", False),
+    "从新到旧": ("day", True),
+    "从旧到新": ("day", False),
+}
+MAX_PYRAMID_JOBS = 32  # 持有缩略图等待写入母版的任务数上限，超出的任务到时重新解码
+SCAN_CHUNK = 500  # 扫描时每批交给界面的记录数
+SEARCH_INDEX_CHUNK = 500  # 主线程空闲时每批建入搜索索引的视频数
+SCAN_CHUNK_SECONDS = 0.2  # 扫描时最多间隔该秒数就把已有记录交给界面
+WATCH_DEBOUNCE = 1.0  # 文件变化停止该秒数后再扫描，合并批量复制产生的大量事件
+WATCH_MAX_DELAY = 10.0  # 持续变化时最多等待该秒数就扫描一次
+# 会改变视频列表的 watchdog 事件；opened、closed 等只是读取（例如播放器、生成缩略图）
+WATCH_EVENT_TYPES = ("created", "deleted", "moved", "modified")
+
+
+def load_config():
+    config = dict(DEFAULT_CONFIG)
+    try:
+        with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+            config.update(json.load(f))
+    except (OSError, ValueError):
+        pass
+    return config
+
+
+def save_config(config):
+    try:
+        with open(CONFIG_PATH, "w", encoding="utf-8") as f:
+            json.dump(config, f, ensure_ascii=False, indent=2)
+    except OSError:
+        pass
+
+
+# 文件名格式：名称[标签]{演员}(系列)~发行时间@星级%特征码
+FILENAME_FIELDS_REGEX = r"(?:\[\s*(.*?)\s*\])?(?:\{\s*(.*?)\s*\})?(?:\(\s*(.*?)\s*\))?(?:~\s*(.*?)\s*)?(?:@\s*(\d+)\s*)?(?:%\s*(.*?)\s*)?$"
+FILENAME_FIELDS = re.compile(FILENAME_FIELDS_REGEX)  # 名称之后的字段部分
+FILENAME_PATTERN = re.compile(r"^(.*?)" + FILENAME_FIELDS_REGEX)  # 完整文件名
+FILENAME_MARKER = re.compile(r"[\[{(~@%]")  # 字段部分只能从这些字符之一开始
+
+
+def parse_filename(filename):
+    """
+    解析文件名，返回 (名称, 标签列表, 演员列表, 系列, 发行时间, 星级, 特征码)。
+    结果按文件名缓存，刷新时不重复解析（每次返回新的列表，调用方可以修改）。
+    """
+    name, tags, actors, series, release, rating, feature = parse_filename_cached(
+        filename
+    )
+    return name, list(tags), list(actors), series, release, rating, feature
+
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_filename_cached(filename):
+    """
+    与完整正则 FILENAME_PATTERN 的结果完全相同，但不让正则在每个位置回溯尝试名称的长度：
+    名称取最短前缀，所以只需从左到右在各个分隔符处尝试匹配字段部分，第一个成功的即是结果；
+    没有分隔符时整个文件名就是名称。含换行的文件名仍使用完整正则（. 不匹配换行）。
+    """
+    base = os.path.splitext(filename)[0]
+    if "\n" in base:
+        match = FILENAME_PATTERN.match(base)
+        if not match:
+            return base, (), (), "", "", 1, ""
+        name, fields = match.group(1), match.groups()[1:]
+    else:
+        name, fields = base, None
+        for marker in FILENAME_MARKER.finditer(base):
+            match = FILENAME_FIELDS.match(base, marker.start())
+            if match:
+                name, fields = base[: marker.start()], match.groups()
+                break
+        if fields is None:
+            return base.strip(), (), (), "", "", 1, ""
+    tags_str, actors_str, series, release, rating_str, feature = fields
+    tags = (
+        tuple([t for t in map(str.strip, tags_str.split(",")) if t]) if tags_str else ()
+    )
+    actors = (
+        tuple([a for a in map(str.strip, actors_str.split(",")) if a])
+        if actors_str
+        else ()
+    )
+    rating = int(rating_str) if rating_str and rating_str.isdigit() else 1
+    return (
+        name.strip(),
+        tags,
+        actors,
+        series.strip() if series else "",
+        release.strip() if release else "",
+        max(1, min(5, rating)),  # 限制1-5
+        feature.strip() if feature else "",
+    )
+
+
+# 查询项：[-]字段(:|=|>=|<=|>|<)值，值可以加引号；不属于这些形式的词按关键词处理
+QUERY_TERM = re.compile(r'(-?)(?:([a-z]+)(>=|<=|:|=|>|<))?("[^"]*"?|[^\s"]*)')
+QUERY_SET_FIELDS = ("tag", "actor", "series")
+QUERY_RANGE_FIELDS = ("rating", "year")
+
+
+class QueryTerm:
+    def __init__(self, text, field, negate, values=(), low=None, high=None):
+        self.text = text  # 原文，用于解释查询
+        self.field = field  # tag / actor / series / rating / year；None 表示关键词
+        self.negate = negate
+        self.values = values  # 集合字段取值之一即可（逗号分隔）；关键词时为 (关键词,)
+        self.low = low  # 星级、年份的闭区间，None 表示不限
+        self.high = high
+
+
+@functools.lru_cache(maxsize=QUERY_CACHE_SIZE)
+def parse_query(text):
+    """
+    解析搜索框中的查询（已小写），返回 QueryTerm 元组，各项之间取交集。例如：
+        tag:a tag:b,c -actor:d rating>=4 year:2019..2022 series:"x y" 关键词
+    同一项中逗号分隔的取值取并集，- 表示排除，rating/year 支持 >=、<=、>、<、= 和 a..b 区间。
+    不含任何字段条件时整段文本作为一个关键词（与原来的搜索相同）；
+    输入到一半的条件（如 "tag:" 或 "rating>="）暂时忽略，不当作关键词。
+    """
+    terms = []
+    has_field = False
+    for match in QUERY_TERM.finditer(text):
+        negate, field, op, value = match.groups()
+        quoted = value.startswith('"')
+        value = value.strip('"')
+        if field in QUERY_SET_FIELDS and op in (":", "="):
+            has_field = True
+            values = (value,) if quoted else tuple(filter(None, value.split(",")))
+            if values:
+                terms.append(QueryTerm(match.group(0), field, bool(negate), values))
+            continue
+        if field in QUERY_RANGE_FIELDS:
+            has_field = True
+            low, sep, high = value.partition("..")
+            if not sep:
+                high = low
+            try:
+                low = int(low) if low else None
+                high = int(high) if high else None
+            except ValueError:
+                continue
+            if low is None and high is None or sep and op not in (":", "="):
+                continue
+            if op in (">=", ">"):
+                low, high = low + (op == ">"), None
+            elif op in ("<=", "<"):
+                low, high = None, high - (op == "<")
+            terms.append(QueryTerm(match.group(0), field, bool(negate), (), low, high))
+            continue
+        if value:
+            word = match.group(0)[len(negate) :].strip('"') if field else value
+            terms.append(QueryTerm(match.group(0), None, bool(negate), (word,)))
+    if not has_field:
+        return (QueryTerm(text, None, False, (text,)),)
+    return tuple(terms)
+
+
+def is_keyword_query(text):
+    """查询是否只是一个普通关键词（结果随关键词变长只会变少）。"""
+    terms = parse_query(text)
+    return len(terms) == 1 and terms[0].field is None and not terms[0].negate
+
+
+def list_covers(cover_dir):
+    """列出 cover 目录一次，返回 {小写文件名（不含扩展名）: 文件名}。"""
+    covers = {}
+    try:
+        with os.scandir(cover_dir) as it:
+            names = [entry.name for entry in it if entry.is_file()]
+    except OSError:
+        return covers
+    rank = {ext: i for i, ext in enumerate(COVER_EXTENSIONS)}
+    found = []
+    for name in names:
+        stem, ext = os.path.splitext(name)
+        if ext.lower() in rank:
+            found.append((rank[ext.lower()], name, stem.lower()))
+    for _, name, key in sorted(found, reverse=True):
+        covers[key] = name  # 倒序写入，优先的格式最后覆盖
+    return covers
+
+
+def norm_path(path):
+    """用于比较的路径形式：统一分隔符和 .. 等写法，Windows 上不区分大小写。"""
+    return os.path.normcase(os.path.normpath(path))
+
+
+def cover_stamp(path):
+    """封面文件的 (大小, 修改时间)，文件不可读时为 None。"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def get_cache_dir(video_dir):
+    """每个视频目录对应用户缓存目录下的一个子目录，避免在（可能只读的）网络共享上写文件。"""
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    key = hashlib.sha1(
+        os.path.normcase(os.path.abspath(video_dir)).encode("utf-8")
+    ).hexdigest()[:16]
+    return os.path.join(base, "LocalVideoManager", key)
+
+
+def to_tk_mode(img):
+    """转换为 PhotoImage 可直接复制的像素格式（RGB/RGBA）并完成解码，应在后台线程调用。"""
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+    img.load()
+    return img
+
+
+def thumb_size(grid_size):
+    thumb_width = grid_size - 2 * TILE_GAP
+    return thumb_width, int(thumb_width / 1.5)  # 固定比例
+
+
+# 所有网格尺寸对应的缩略图尺寸。最大的一个作为母版写入磁盘缓存，
+# 其余尺寸在网格实际用到时由母版缩小生成
+THUMB_PYRAMID = tuple(thumb_size(g) for g in GRID_SIZES)
+
+
+def fit_size(src_size, w, h):
+    """等比缩放到不超过 (w, h) 时的尺寸（不放大）。"""
+    src_w, src_h = src_size
+    scale = min(w / src_w, h / src_h, 1.0)
+    return (max(1, round(src_w * scale)), max(1, round(src_h * scale)))
+
+
+class BadCoverError(Exception):
+    """封面文件能读取但无法解码（格式不支持、数据损坏或尺寸过大），可以记入负缓存。"""
+
+
+def decode_cover(path, w, h, quality="balanced"):
+    """
+    解码封面并等比缩放到不超过 (w, h)。
+    JPEG 先用 draft 在 DCT 阶段按 1/2、1/4、1/8 缩小解码，再用整数 reduce()
+    缩到目标尺寸的若干倍，最后用所选滤镜精确缩放，避免按原始分辨率解码和重采样。
+    文件先整体读入内存：读取时的 OSError（文件缺失、网络共享暂时不可用）原样抛出，
+    之后 Pillow 解码失败才包装为 BadCoverError，两者由调用方区别对待。
+    """
+    _, gap, resample = THUMB_QUALITIES.get(quality, THUMB_QUALITIES["balanced"])
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        img = Image.open(io.BytesIO(data))
+        size = fit_size(img.size, w, h)
+        img.draft("RGB", (size[0] * gap, size[1] * gap))
+        img = to_tk_mode(img)
+        factor = min(img.width // (size[0] * gap), img.height // (size[1] * gap))
+        if factor > 1:
+            img = img.reduce(factor)
+        if img.size != size:
+            img = img.resize(size, getattr(Image.Resampling, resample))
+    except (OSError, ValueError, SyntaxError, Image.DecompressionBombError) as e:
+        # UnidentifiedImageError 是 OSError 的子类
+        raise BadCoverError(f"{path}: {e}") from e
+    return img
+
+
+def encode_thumb(img):
+    """编码为写入磁盘缓存的 PNG 数据。"""
+    with io.BytesIO() as bio:
+        img.save(bio, format="PNG")
+        return bio.getvalue()
+
+
+def decode_cover_shared(shm_name, path, w, h, quality):
+    """在子进程中解码封面，把像素写入主进程分配的共享内存，只返回模式和尺寸。"""
+    img = decode_cover(path, w, h, quality)
+    data = img.tobytes()
+    # 子进程与主进程共用同一个 resource_tracker，重复登记无副作用，释放由主进程负责
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        shm.buf[: len(data)] = data
+    finally:
+        shm.close()
+    return img.mode, img.size
+
+
+class ProcessDecoder:
+    """
+    进程池封面解码。Pillow 解码受 GIL 限制只能用满约一个核心，
+    改由子进程解码；像素通过 multiprocessing.shared_memory 传回，不经过 pickle。
+    共享内存由主进程按最大可能尺寸（宽×高×4）分配并负责释放，Windows 下同样可用。
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def decode(self, path, w, h, quality):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            executor = self.executor
+        shm = shared_memory.SharedMemory(create=True, size=w * h * 4)
+        try:
+            mode, size = executor.submit(
+                decode_cover_shared, shm.name, path, w, h, quality
+            ).result()
+            view = shm.buf[: size[0] * size[1] * len(mode)]
+            try:
+                img = Image.frombytes(mode, size, view)
+            finally:
+                view.release()  # 仍有导出的 memoryview 时 shm.close() 会失败
+        finally:
+            shm.close()
+            shm.unlink()
+        return img
+
+    def resize(self, workers):
+        if workers != self.workers:
+            self.workers = workers
+            self.shutdown()
+
+    def shutdown(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def bench_decode_backends(cover_dir=None, workers=None):
+    """
+    比较两种解码方式的吞吐量（封面/秒）。
+    cover_dir 为空时生成一批 3000x2000 的测试 JPEG。
+    """
+    workers = workers or os.cpu_count() or 4
+    w, h = THUMB_PYRAMID[-1]
+    with tempfile.TemporaryDirectory() as tmp:
+        if cover_dir:
+            paths = [
+                os.path.join(cover_dir, name)
+                for name in os.listdir(cover_dir)
+                if name.lower().endswith((".jpg", ".jpeg", ".png", ".webp"))
+            ]
+        else:
+            paths = []
+            for i in range(workers * 6):
+                path = os.path.join(tmp, f"{i}.jpg")
+                Image.effect_noise((3000, 2000), 40 + i).convert("RGB").save(path)
+                paths.append(path)
+        decoder = ProcessDecoder(workers)
+        decoder.decode(paths[0], w, h, "balanced")  # 预先启动子进程
+        backends = {
+            "thread": lambda p: decode_cover(p, w, h, "balanced"),
+            "process": lambda p: decoder.decode(p, w, h, "balanced"),
+        }
+        results = {}
+        for name, decode in backends.items():
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(decode, paths))
+            results[name] = len(paths) / (time.perf_counter() - start)
+        decoder.shutdown()
+    for name, rate in results.items():
+        print(
+            f"{DECODE_BACKENDS[name]}: {rate:.1f} 封面/秒 ({len(paths)} 张, {workers} 并发)"
+        )
+    return results
+
+
+def bench_thumb_handoff(count=200, size=(690, 460)):
+    """
+    比较主线程上每张缩略图的耗时：
+    旧方式为 PNG 字节交给 PhotoImage(data=...) 再解码，新方式为直接复制已解码的像素。
+    """
+    root = tk.Tk()
+    root.withdraw()
+    img = Image.effect_noise(size, 64).convert("RGB")
+    with io.BytesIO() as bio:
+        img.save(bio, format="PNG")
+        data = bio.getvalue()
+    results = {}
+    for label, make in (
+        ("PNG 数据", lambda: ImageTk.PhotoImage(data=data)),
+        ("像素复制", lambda: ImageTk.PhotoImage(img)),
+    ):
+        start = time.perf_counter()
+        for _ in range(count):
+            make()
+        results[label] = (time.perf_counter() - start) * 1000 / count
+    root.destroy()
+    for label, ms in results.items():
+        print(f"{label}: {ms:.3f} ms/张 ({size[0]}x{size[1]}, {count} 次)")
+    return results
+
+
+def bench_scan(video_dir, *workers):
+    """比较不同并发数下完整扫描视频目录的吞吐量（文件/秒），不读写索引。"""
+    LibraryScanner(DEFAULT_CONFIG["scan_workers"]).scan(
+        video_dir, {}, {}
+    )  # 预热系统缓存
+    for n in workers or [1, DEFAULT_CONFIG["scan_workers"]]:
+        scanner = LibraryScanner(n)
+        scanner.scan(video_dir, {}, {})
+        stats = scanner.stats
+        print(
+            f"{n} 并发: {stats['files'] / max(stats['seconds'], 1e-6):.0f} 文件/秒 "
+            f"({stats['files']} 个视频, {stats['dirs']} 个目录, {stats['seconds']:.2f} 秒)"
+        )
+
+
+def bench_parse(count=200000):
+    """
+    比较文件名解析的吞吐量（文件名/秒）：每个文件名用完整正则 FILENAME_PATTERN 匹配（原始做法）、
+    parse_filename 无缓存（首次扫描）和缓存命中（再次刷新）。
+    结果的一致性由 tests/test_parse_filename.py 检查。
+    """
+    rng = random.Random(0)
+    fields = [
+        lambda i: f"[tag{rng.randint(0, 50)}, tag{rng.randint(0, 50)}]",
+        lambda i: f"{{Actor{rng.randint(0, 2000)}}}",
+        lambda i: f"(Series{rng.randint(0, 300)})",
+        lambda i: f"~20{rng.randint(0, 24):02d}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+        lambda i: f"@{rng.randint(1, 5)}",
+        lambda i: f"%ABC-{i}",
+    ]
+    corpus = []
+    for i in range(count):
+        # 约两成没有任何字段，其余各字段随机缺失
+        chosen = (
+            [f(i) for f in fields if rng.random() < 0.6] if rng.random() < 0.8 else []
+        )
+        corpus.append(f"Video {i} 测试" + "".join(chosen) + ".mp4")
+    results = {}
+    for label, parse in (
+        ("完整正则", lambda f: FILENAME_PATTERN.match(os.path.splitext(f)[0])),
+        ("parse_filename（无缓存）", parse_filename),
+        ("parse_filename（缓存命中）", parse_filename),
+    ):
+        if "无缓存" in label:
+            parse_filename_cached.cache_clear()
+        start = time.perf_counter()
+        for f in corpus:
+            parse(f)
+        results[label] = len(corpus) / (time.perf_counter() - start)
+        print(f"{label}: {results[label]:.0f} 文件名/秒（{len(corpus)} 个）")
+    parse_filename_cached.cache_clear()
+    return results
+
+
+def bench_columns(count=200000, batch=24):
+    """
+    在随机生成的视频记录上比较按列筛选 + 排序与逐个元组计算的耗时，并确认结果相同：
+    星级 >= 4 且发行年份在 2019..2022 的视频按从新到旧排列（列掩码，以及界面中的查询），
+    勾选星级后按从新到旧排列，以及未筛选时全库按各排序选项排列。
+    filter_videos 的耗时包含取出第一批（batch 个）视频元组，即界面显示第一屏前的全部工作。
+    """
+    rng = random.Random(0)
+    actors = [f"Actor{i}" for i in range(2000)]
+    videos = []
+    for i in range(count):
+        release = ""
+        if rng.random() < 0.9:  # 约一成没有发行日期
+            release = f"{rng.randint(2000, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        cast = rng.sample(actors, rng.randint(0, 4))
+        videos.append(
+            (
+                f"/v/{i}.mp4",
+                f"Video {i}",
+                [],
+                cast,
+                "",
+                release,
+                rng.randint(1, 5),
+                None,
+                "",
+            )
+        )
+    browser = VideoBrowser.__new__(VideoBrowser)
+    browser.set_videos(videos)
+    browser.selected_tags = browser.selected_actors = set()
+    browser.selected_series = browser.selected_ratings = set()
+    np.zeros(0)  # 先导入 NumPy，不计入建立时间
+    start = time.perf_counter()
+    browser.build_columns()
+    print(
+        f"建立列式副本（{len(videos)} 条）: {(time.perf_counter() - start) * 1000:.1f} ms"
+    )
+    columns = browser.columns
+    days = {
+        "从新到旧": lambda v: browser.release_date(v[5]) or datetime.min,
+        "从旧到新": lambda v: browser.release_date(v[5]) or datetime.max,
+    }
+    keys = {"rating": itemgetter(6), "actors": lambda v: len(v[3])}
+
+    start = time.perf_counter()
+    expected = [
+        v for v in videos if v[6] >= 4 and 2019 <= days["从新到旧"](v).year <= 2022
+    ]
+    expected.sort(key=days["从新到旧"], reverse=True)
+    by_tuples = (time.perf_counter() - start) * 1000
+    low = datetime(2019, 1, 1).toordinal()
+    high = datetime(2022, 12, 31).toordinal()
+    start = time.perf_counter()
+    mask = columns.alive & (columns.rating >= 4) & (columns.day >= low)
+    mask &= columns.day <= high
+    ids = np.flatnonzero(mask)
+    result = columns.view(ids[columns.order(ids, "从新到旧")])[:batch]
+    by_columns = (time.perf_counter() - start) * 1000
+    same = result == expected[:batch]
+    print(
+        f"列掩码筛选 + 排序（{len(ids)} 条结果）: 列 {by_columns:.1f} ms，"
+        f"元组 {by_tuples:.1f} ms，结果{'相同' if same else '不同'}"
+    )
+
+    def timed(option):
+        start = time.perf_counter()
+        result = browser.filter_videos(option)
+        result[:batch]
+        return result, (time.perf_counter() - start) * 1000
+
+    browser.search_keyword = "rating>=4 year:2019..2022"
+    result, elapsed = timed("从新到旧")
+    ok = list(result) == expected
+    same = same and ok
+    print(
+        f"查询 {browser.search_keyword!r} + 从新到旧: {elapsed:.1f} ms，"
+        f"结果{'相同' if ok else '不同'}"
+    )
+
+    browser.search_keyword = ""
+    browser.selected_ratings = {4, 5}
+    expected = sorted(
+        (v for v in videos if v[6] in browser.selected_ratings),
+        key=days["从新到旧"],
+        reverse=True,
+    )
+    result, elapsed = timed("从新到旧")
+    ok = list(result) == expected
+    same = same and ok
+    print(
+        f"勾选星级 4、5 + 从新到旧（{len(result)} 条结果）: {elapsed:.1f} ms，"
+        f"结果{'相同' if ok else '不同'}"
+    )
+
+    browser.selected_ratings = set()
+    for option, (column, descending) in COLUMN_SORTS.items():
+        key = days[option] if column == "day" else keys[column]
+        start = time.perf_counter()
+        expected = sorted(videos, key=key, reverse=descending)
+        by_tuples = (time.perf_counter() - start) * 1000
+        result, elapsed = timed(option)
+        ok = list(result) == expected
+        same = same and ok
+        print(
+            f"全库{option}: filter_videos {elapsed:.1f} ms，逐个元组排序 {by_tuples:.1f} ms，"
+            f"结果{'相同' if ok else '不同'}"
+        )
+    return same
+
+
+class ColumnStore:
+    """
+    视频库的列式副本（需要 NumPy），下标为视频序号（video_seq）：
+    星级 int8、发行日期的公历序数 int32（0 表示没有日期）、演员数 int16，以及是否仍在库中；
+    rows 按同样的下标存放视频元组，用于把排好序的下标换回视频。
+    排序与区间筛选在整列上向量化执行，不再对每个视频调用 Python 函数。
+    """
+
+    COLUMNS = ("rating", "day", "actors", "alive")
+
+    def __init__(self, capacity=1024):
+        self.rating = np.zeros(capacity, np.int8)
+        self.day = np.zeros(capacity, np.int32)
+        self.actors = np.zeros(capacity, np.int16)
+        self.alive = np.zeros(capacity, np.bool_)
+        self.rows = [None] * capacity
+
+    def grow(self, size):
+        if size <= len(self.alive):
+            return
+        capacity = max(size, 2 * len(self.alive))
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros(capacity, column.dtype)
+            grown[: len(column)] = column
+            setattr(self, name, grown)
+        self.rows.extend([None] * (capacity - len(self.rows)))
+
+    def load(self, seqs, videos, days):
+        """批量写入，seqs、videos、days 一一对应。"""
+        count = len(videos)
+        ids = np.fromiter(seqs, np.int64, count)
+        if count:
+            self.grow(int(ids.max()) + 1)
+        self.rating[ids] = np.fromiter(map(itemgetter(6), videos), np.int8, count)
+        self.day[ids] = np.fromiter(days, np.int32, count)
+        self.actors[ids] = np.fromiter(
+            (min(len(v[3]), 0x7FFF) for v in videos), np.int16, count
+        )
+        self.alive[ids] = True
+        for seq, video in zip(ids.tolist(), videos):
+            self.rows[seq] = video
+
+    def put(self, seq, video, day):
+        self.grow(seq + 1)
+        self.rating[seq] = video[6]
+        self.day[seq] = day
+        self.actors[seq] = min(len(video[3]), 0x7FFF)
+        self.alive[seq] = True
+        self.rows[seq] = video
+
+    def discard(self, seq):
+        self.alive[seq] = False
+        self.rows[seq] = None
+
+    def mask(self, term):
+        """星级或年份查询项对应的布尔掩码（排除项取反，与倒排表的结果相同）。"""
+        if term.field == "rating":
+            values = self.rating
+            low = 0 if term.low is None else max(0, min(term.low, 127))
+            high = 127 if term.high is None else max(0, min(term.high, 127))
+        else:
+            values = self.day
+            low = 1 if term.low is None else max(1, min(term.low, 9999))
+            low = datetime(low, 1, 1).toordinal()  # 没有日期（0）的视频不满足任何年份
+            high = 9999 if term.high is None else max(1, min(term.high, 9999))
+            high = datetime(high, 12, 31).toordinal()
+        mask = (values >= low) & (values <= high)
+        return ~mask if term.negate else mask
+
+    def rating_mask(self, ratings):
+        """星级为 ratings 之一的布尔掩码（左侧栏勾选的星级）。"""
+        return np.isin(self.rating, sorted(ratings))
+
+    def view(self, ids):
+        return ColumnView(self.rows[:], ids)  # 复制的是引用列表，之后增删视频不影响结果
+
+    def order(self, ids, sort_option):
+        """
+        返回 ids 按排序选项排列后的位置，与对视频元组做稳定的 list.sort 结果相同：
+        相等的保持原来的先后，没有日期的视频在两种日期排序中都排在最后。
+        键用 int8/int16 时 NumPy 的稳定排序走基数排序：星级、演员数本来就是窄类型，
+        日期换成相对最早日期的天数，跨度不到约 90 年时也能放进 int16。
+        """
+        column, descending = COLUMN_SORTS[sort_option]
+        keys = getattr(self, column)[ids]  # 花式下标返回副本，可以原地修改
+        if column == "day":
+            dated = keys != 0
+            if dated.any():
+                keys = np.where(dated, keys - (keys[dated].min() - 1), 0)
+                if keys.max() < np.iinfo(np.int16).max:
+                    keys = keys.astype(np.int16)
+        if descending:
+            keys = -keys
+        elif column == "day":
+            keys[keys == 0] = np.iinfo(keys.dtype).max
+        return np.argsort(keys, kind="stable")
+
+
+class ColumnView:
+    """
+    ColumnStore 排好序的结果：按下标数组排列的视频序列，取用时才把下标换成视频元组。
+    网格每批只渲染几十个瓦片，不必先为全部结果建立元组列表。
+    支持 len、下标、切片（返回列表）和迭代，可以代替视频列表使用。
+    """
+
+    def __init__(self, rows, ids):
+        self.rows = rows
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(map(self.rows.__getitem__, self.ids[index].tolist()))
+        return self.rows[self.ids[index]]
+
+    def __iter__(self):
+        return map(self.rows.__getitem__, self.ids.tolist())
+
+
+class UiDispatcher:
+    """
+    后台线程回到界面的唯一通道。
+    Tk 不支持在其他线程调用 after()，所以任何线程都只调用 post() 把回调放入线程安全队列，
+    主循环按固定间隔取出，在时间预算内批量执行，一批结果只触发一次重绘，未执行完的留到下一轮。
+    """
+
+    def __init__(self, root, tick_ms=UI_TICK_MS, budget_ms=UI_TICK_BUDGET_MS):
+        self.root = root
+        self.queue = deque()  # deque 的 append/popleft 是线程安全的
+        self.tick_ms = tick_ms
+        self.budget = budget_ms / 1000
+        self.root.after(self.tick_ms, self.drain)
+
+    def post(self, func, *args):
+        self.queue.append((func, args))
+
+    def drain(self):
+        deadline = time.perf_counter() + self.budget
+        while self.queue and time.perf_counter() < deadline:
+            func, args = self.queue.popleft()
+            try:
+                func(*args)
+            except Exception:
+                self.root.report_callback_exception(*sys.exc_info())
+        self.root.after(self.tick_ms, self.drain)
+
+
+class PhotoImageCache:
+    """
+    已解码缩略图（PhotoImage）的内存 LRU，键为 (封面路径, 宽, 高)，只在 Tk 主线程使用
+    （stale_paths 除外）。占用按 宽×高×4 字节估算。
+    每个条目记录解码时封面文件的状态，用于发现被原地替换的封面。
+    """
+
+    def __init__(self, budget_mb):
+        self.budget = budget_mb * 1024 * 1024
+        self.images = OrderedDict()  # 键 -> (PhotoImage, 字节数)
+        self.stamps = {}  # 键 -> 解码时的封面文件状态（cover_stamp）
+        self.total = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key):
+        return key in self.images
+
+    def get(self, key):
+        item = self.images.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.images.move_to_end(key)
+        return item[0]
+
+    def put(self, key, photo, stamp=None):
+        size = photo.width() * photo.height() * 4
+        old = self.images.pop(key, None)
+        if old:
+            self.total -= old[1]
+        self.images[key] = (photo, size)
+        self.stamps[key] = stamp
+        self.total += size
+        self.evict()
+
+    def invalidate(self, path):
+        for key in [key for key in self.images if key[0] == path]:
+            self.total -= self.images.pop(key)[1]
+            self.stamps.pop(key, None)
+
+    def paths(self):
+        return {key[0] for key in self.images}
+
+    def stale_paths(self):
+        """
+        返回文件状态与解码时不同的封面路径（被原地替换或删除），可在后台线程调用。
+        轮询模式没有变化通知，由监视线程用它发现需要丢弃的旧图。
+        """
+        stamps = {}
+        for key, stamp in self.stamps.copy().items():
+            stamps.setdefault(key[0], set()).add(stamp)
+        return {path for path, seen in stamps.items() if seen != {cover_stamp(path)}}
+
+    def clear(self):
+        self.images.clear()
+        self.stamps.clear()
+        self.total = 0
+
+    def set_budget(self, budget_mb):
+        self.budget = budget_mb * 1024 * 1024
+        self.evict()
+
+    def evict(self):
+        while self.total > self.budget and self.images:
+            key, (_, size) = self.images.popitem(last=False)
+            self.stamps.pop(key, None)
+            self.total -= size
+            self.evictions += 1
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "count": len(self.images),
+            "mb": self.total / (1024 * 1024),
+        }
+
+
+class ThumbJob:
+    def __init__(self, row, func, args):
+        self.row = row  # 瓦片所在行，用于按视口距离排序；None 表示与瓦片无关的后台任务
+        self.func = func
+        self.args = args
+        self.seq = 0
+        self.cancelled = False
+
+
+class ThumbnailWorkerPool:
+    """
+    固定数量的封面解码线程，从优先队列取任务。
+    优先级为 (与当前视口的行距离, -提交序号)：视口内的先解码，同距离时最新提交的先解码。
+    排队任务超过上限时，距离视口最远的任务被暂存，视口移动或队列取空后再按新距离重新入队。
+    后台任务（如写入母版缩略图）排在所有瓦片之后，且不随瓦片一起取消。
+    """
+
+    def __init__(self, workers, max_pending):
+        self.cond = threading.Condition()
+        self.heap = []
+        self.parked = []  # 超出队列上限而暂存的任务
+        self.seq = 0
+        self.viewport = (0, 0)
+        self.max_pending = max_pending
+        self.target_workers = 0
+        self.live_workers = 0
+        self.resize(workers, max_pending)
+
+    def priority(self, job):
+        first, last = self.viewport
+        if job.row is None:
+            distance = float("inf")
+        elif job.row < first:
+            distance = first - job.row
+        elif job.row > last:
+            distance = job.row - last
+        else:
+            distance = 0
+        return (distance, -job.seq)
+
+    def submit(self, row, func, *args):
+        job = ThumbJob(row, func, args)
+        with self.cond:
+            self.seq += 1
+            job.seq = self.seq
+            heapq.heappush(self.heap, (self.priority(job), job.seq, job))
+            self.trim_locked()
+            self.cond.notify()
+        return job
+
+    def trim_locked(self):
+        if len(self.heap) <= self.max_pending:
+            return
+        self.heap.sort()
+        self.parked.extend(item[2] for item in self.heap[self.max_pending :])
+        del self.heap[self.max_pending :]  # 有序列表本身满足堆性质
+
+    def set_viewport(self, first_row, last_row):
+        with self.cond:
+            if self.viewport == (first_row, last_row):
+                return
+            self.viewport = (first_row, last_row)
+            jobs = [item[2] for item in self.heap] + self.parked
+            self.parked = []
+            self.heap = [(self.priority(job), job.seq, job) for job in jobs]
+            heapq.heapify(self.heap)
+            self.trim_locked()
+            self.cond.notify_all()
+
+    def cancel_all(self):
+        """取消所有尚未开始的瓦片任务（瓦片被销毁时调用）。"""
+        with self.cond:
+            jobs = [item[2] for item in self.heap] + self.parked
+            for job in jobs:
+                if job.row is not None:
+                    job.cancelled = True
+            self.parked = []
+            self.heap = [
+                (self.priority(job), job.seq, job) for job in jobs if not job.cancelled
+            ]
+            heapq.heapify(self.heap)
+            self.trim_locked()
+
+    def pending(self, background=True):
+        with self.cond:
+            jobs = [item[2] for item in self.heap] + self.parked
+            if background:
+                return len(jobs)
+            return sum(1 for job in jobs if job.row is not None)
+
+    def background_pending(self):
+        with self.cond:
+            jobs = [item[2] for item in self.heap] + self.parked
+            return sum(1 for job in jobs if job.row is None)
+
+    def resize(self, workers, max_pending):
+        with self.cond:
+            self.max_pending = max(1, max_pending)
+            self.target_workers = max(1, workers)
+            self.trim_locked()
+            while self.live_workers < self.target_workers:
+                self.live_workers += 1
+                threading.Thread(target=self.worker_loop, daemon=True).start()
+            self.cond.notify_all()  # 让多余的线程退出
+
+    def worker_loop(self):
+        while True:
+            with self.cond:
+                while not self.heap and self.live_workers <= self.target_workers:
+                    if self.parked:
+                        # 队列已空：暂存的任务重新入队，不必等视口移动
+                        self.heap = [
+                            (self.priority(job), job.seq, job) for job in self.parked
+                        ]
+                        self.parked = []
+                        heapq.heapify(self.heap)
+                        self.trim_locked()
+                        continue
+                    self.cond.wait()
+                if self.live_workers > self.target_workers:
+                    self.live_workers -= 1
+                    return
+                _, _, job = heapq.heappop(self.heap)
+            if job.cancelled:
+                continue
+            try:
+                job.func(*job.args)
+            except Exception:
+                pass
+
+
+class ThumbnailCache:
+    """
+    磁盘缩略图缓存，每个条目一个文件。
+    条目名为 "<封面路径哈希>_<大小/修改时间哈希>_<宽>x<高>_<质量>.png"，
+    损坏的封面记录为同名的空 ".bad" 文件，避免每次重新解码。
+    同一封面写入新版本时，旧修改时间的条目自动删除。
+    文件修改时间即最近使用时间，超出容量上限时按 LRU 淘汰。
+    """
+
+    dir_name = "thumbs"
+
+    def __init__(self, cache_dir, budget_mb):
+        self.dir = os.path.join(cache_dir, self.dir_name)
+        self.budget = budget_mb * 1024 * 1024
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # 条目名 -> 字节数，按最近使用排序
+        self.by_path = defaultdict(set)  # 封面路径哈希 -> 条目名
+        self.total = 0
+        os.makedirs(self.dir, exist_ok=True)
+        for name, size in self.load_entries():
+            self.add_locked(name, size)
+
+    def load_entries(self):
+        """返回按最近使用排序的 (条目名, 字节数)。"""
+        items = []
+        with os.scandir(self.dir) as it:
+            for entry in it:
+                if entry.name.endswith((".png", ".bad")):
+                    st = entry.stat()
+                    items.append((st.st_mtime, entry.name, st.st_size))
+        return [(name, size) for _, name, size in sorted(items)]
+
+    def read_data(self, name):
+        file_path = os.path.join(self.dir, name)
+        with open(file_path, "rb") as f:
+            data = f.read()
+        os.utime(file_path)  # 记录最近使用时间，重启后仍保持 LRU 顺序
+        return data
+
+    def write_data(self, name, data):
+        file_path = os.path.join(self.dir, name)
+        tmp_path = f"{file_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, file_path)
+
+    def delete_data_locked(self, name):
+        try:
+            os.remove(os.path.join(self.dir, name))
+        except OSError:
+            pass
+
+    def maybe_compact(self):
+        pass
+
+    def close(self):
+        pass
+
+    @staticmethod
+    def path_key(path):
+        return hashlib.sha1(
+            os.path.normcase(os.path.abspath(path)).encode("utf-8")
+        ).hexdigest()[:16]
+
+    def entry_base(self, path, w, h, quality):
+        st = os.stat(path)
+        stat_key = hashlib.sha1(
+            f"{st.st_size}:{st.st_mtime_ns}".encode("ascii")
+        ).hexdigest()[:8]
+        return f"{self.path_key(path)}_{stat_key}_{w}x{h}_{quality}"
+
+    def get(self, path, w, h, quality):
+        """命中返回 PNG 数据，损坏封面返回 BAD_IMAGE，未命中返回 None。"""
+        try:
+            base = self.entry_base(path, w, h, quality)
+        except OSError:
+            return None
+        with self.lock:
+            if base + ".bad" in self.entries:
+                self.entries.move_to_end(base + ".bad")
+                return BAD_IMAGE
+            if base + ".png" not in self.entries:
+                return None
+            self.entries.move_to_end(base + ".png")
+        # 条目可能在释放锁之后被淘汰：目录缓存的文件已删除（OSError），打包缓存返回 None
+        try:
+            return self.read_data(base + ".png")
+        except (OSError, ValueError):
+            self.discard(base + ".png")
+            return None
+
+    def contains(self, path, w, h, quality):
+        try:
+            base = self.entry_base(path, w, h, quality)
+        except OSError:
+            return False
+        with self.lock:
+            return base + ".png" in self.entries
+
+    def put(self, path, w, h, quality, data):
+        try:
+            base = self.entry_base(path, w, h, quality)
+        except OSError:
+            return
+        self.write_entry(base + ".png", data)
+
+    def put_bad(self, path, w, h, quality):
+        try:
+            base = self.entry_base(path, w, h, quality)
+        except OSError:
+            return
+        self.write_entry(base + ".bad", b"")
+
+    def write_entry(self, name, data):
+        try:
+            self.write_data(name, data)
+        except (OSError, ValueError):
+            return
+        path_key, stat_key, _ = name.split("_", 2)
+        with self.lock:
+            # 封面已被替换：删除旧版本的所有尺寸
+            for old in list(self.by_path.get(path_key, ())):
+                if old.split("_", 2)[1] != stat_key:
+                    self.remove_locked(old)
+            self.add_locked(name, len(data))
+            self.evict_locked()
+        self.maybe_compact()
+
+    def add_locked(self, name, size):
+        self.total -= self.entries.pop(name, 0)
+        self.entries[name] = size
+        self.by_path[name.split("_", 1)[0]].add(name)
+        self.total += size
+
+    def remove_locked(self, name):
+        self.total -= self.entries.pop(name)
+        path_key = name.split("_", 1)[0]
+        names = self.by_path[path_key]
+        names.discard(name)
+        if not names:
+            del self.by_path[path_key]
+        self.delete_data_locked(name)
+
+    def discard(self, name):
+        with self.lock:
+            if name in self.entries:
+                self.remove_locked(name)
+
+    def invalidate(self, path):
+        """删除某个封面的所有缓存条目（封面被重命名时调用）。"""
+        with self.lock:
+            for name in list(self.by_path.get(self.path_key(path), ())):
+                self.remove_locked(name)
+        self.maybe_compact()
+
+    def set_budget(self, budget_mb):
+        with self.lock:
+            self.budget = budget_mb * 1024 * 1024
+            self.evict_locked()
+        self.maybe_compact()
+
+    def evict_locked(self):
+        while self.total > self.budget and self.entries:
+            self.remove_locked(next(iter(self.entries)))
+
+
+class ThumbnailPackStore(ThumbnailCache):
+    """
+    打包的缩略图缓存：所有条目追加写入单个 thumbs.pack，
+    thumbs.idx 是追加写入的 "条目名 偏移 长度" / "-条目名" 索引日志。
+    读取通过 mmap 切片完成，不需要为每张缩略图打开、关闭文件。
+    删除和淘汰只在索引中记录，失效字节多于有效字节时整体压缩重写。
+    启动后的 LRU 顺序近似为写入顺序，压缩时按当前 LRU 顺序重写。
+    """
+
+    dir_name = "thumbpack"
+    compact_min_bytes = 16 * 1024 * 1024
+
+    def load_entries(self):
+        self.pack_path = os.path.join(self.dir, "thumbs.pack")
+        self.idx_path = os.path.join(self.dir, "thumbs.idx")
+        self.locations = OrderedDict()  # 条目名 -> (偏移, 长度)
+        self.mm = None
+        self.pack = open(self.pack_path, "ab+")
+        pack_size = self.pack.seek(0, os.SEEK_END)
+        try:
+            with open(self.idx_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 3 and int(parts[1]) + int(parts[2]) <= pack_size:
+                        self.locations.pop(parts[0], None)
+                        self.locations[parts[0]] = (int(parts[1]), int(parts[2]))
+                    elif len(parts) == 1 and parts[0].startswith("-"):
+                        self.locations.pop(parts[0][1:], None)
+        except (OSError, ValueError):
+            pass
+        self.idx = open(self.idx_path, "a", encoding="utf-8")
+        live = sum(length for _, length in self.locations.values())
+        self.stale = pack_size - live
+        return [(name, length) for name, (_, length) in self.locations.items()]
+
+    def remap_locked(self):
+        if self.mm is not None:
+            self.mm.close()
+        self.mm = mmap.mmap(self.pack.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def read_data(self, name):
+        with self.lock:
+            location = self.locations.get(name)
+            if location is None:
+                return None  # 在 get() 检查之后被其他线程淘汰，按未命中处理
+            offset, length = location
+            if self.mm is None or offset + length > len(self.mm):
+                self.remap_locked()  # 文件在映射之后追加过
+            return self.mm[offset : offset + length]
+
+    def write_data(self, name, data):
+        with self.lock:
+            offset = self.pack.seek(0, os.SEEK_END)
+            self.pack.write(data)
+            self.pack.flush()
+            old = self.locations.pop(name, None)
+            if old:
+                self.stale += old[1]
+            self.locations[name] = (offset, len(data))
+            self.idx.write(f"{name} {offset} {len(data)}\n")
+            self.idx.flush()
+
+    def delete_data_locked(self, name):
+        old = self.locations.pop(name, None)
+        if old:
+            self.stale += old[1]
+            try:
+                self.idx.write(f"-{name}\n")
+                self.idx.flush()
+            except (OSError, ValueError):
+                pass
+
+    def maybe_compact(self):
+        with self.lock:
+            if self.stale > max(self.compact_min_bytes, self.total):
+                try:
+                    self.compact_locked()
+                except (OSError, ValueError):
+                    pass
+
+    def compact_locked(self):
+        """按当前 LRU 顺序只重写有效条目，替换原打包文件和索引。"""
+        if self.mm is None and self.locations:
+            self.remap_locked()
+        locations = OrderedDict()
+        with open(self.pack_path + ".tmp", "wb") as out, open(
+            self.idx_path + ".tmp", "w", encoding="utf-8"
+        ) as idx:
+            for name in self.entries:
+                offset, length = self.locations[name]
+                locations[name] = (out.tell(), length)
+                out.write(self.mm[offset : offset + length])
+                idx.write(f"{name} {locations[name][0]} {length}\n")
+        self.close_files_locked()
+        os.replace(self.pack_path + ".tmp", self.pack_path)
+        os.replace(self.idx_path + ".tmp", self.idx_path)
+        self.pack = open(self.pack_path, "ab+")
+        self.idx = open(self.idx_path, "a", encoding="utf-8")
+        self.locations = locations
+        self.stale = 0
+
+    def close_files_locked(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+        self.pack.close()
+        self.idx.close()
+
+    def close(self):
+        with self.lock:
+            self.close_files_locked()
+
+
+class PreviewStore:
+    """
+    封面的低清预览图（不超过 PREVIEW_SIZE），与视频目录的缓存保存在一起。
+    瓦片创建时先把预览图放大显示，完整缩略图解码完成后再替换。
+    文件格式为连续记录：路径字节数(u16) 路径 宽(u8) 高(u8) RGB 像素。
+    """
+
+    def __init__(self, cache_dir):
+        self.path = os.path.join(cache_dir, "previews.dat")
+        self.lock = threading.Lock()
+        self.previews = {}  # 封面路径 -> (宽, 高, RGB 字节)
+        self.dirty = False
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return
+        pos = 0
+        try:
+            while pos < len(data):
+                (length,) = struct.unpack_from("<H", data, pos)
+                path = data[pos + 2 : pos + 2 + length].decode("utf-8")
+                w, h = struct.unpack_from("<BB", data, pos + 2 + length)
+                pos += 4 + length
+                self.previews[path] = (w, h, data[pos : pos + w * h * 3])
+                pos += w * h * 3
+        except (struct.error, UnicodeDecodeError):
+            pass  # 文件尾部损坏时保留已读出的部分
+
+    def get(self, path):
+        return self.previews.get(path)
+
+    def put(self, path, img):
+        size = fit_size(img.size, *PREVIEW_SIZE)
+        small = img.convert("RGB").resize(size, Image.Resampling.BOX)
+        with self.lock:
+            self.previews[path] = (size[0], size[1], small.tobytes())
+            self.dirty = True
+
+    def invalidate(self, path):
+        with self.lock:
+            if self.previews.pop(path, None):
+                self.dirty = True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            chunks = []
+            for path, (w, h, pixels) in self.previews.items():
+                encoded = path.encode("utf-8")
+                chunks.append(struct.pack("<H", len(encoded)))
+                chunks.append(encoded)
+                chunks.append(struct.pack("<BB", w, h))
+                chunks.append(pixels)
+            self.dirty = False
+        try:
+            with open(self.path + ".tmp", "wb") as f:
+                f.write(b"".join(chunks))
+            os.replace(self.path + ".tmp", self.path)
+        except OSError:
+            pass
+
+
+class LibraryIndex:
+    """
+    视频目录的持久化索引（SQLite，保存在该目录的缓存文件夹中）。
+    videos 表记录每个视频解析后的字段、封面路径和文件大小/修改时间，
+    dirs 表记录每个目录及其 cover 子目录的修改时间和子目录列表，供增量扫描跳过未变化的目录。
+    选择目录时直接读出即可显示，文件系统扫描改为后台核对。
+    """
+
+    def __init__(self, cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(
+            os.path.join(cache_dir, "library.db"), check_same_thread=False
+        )
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS videos (
+                    path TEXT PRIMARY KEY,
+                    seq INTEGER,
+                    name TEXT,
+                    tags TEXT,
+                    actors TEXT,
+                    series TEXT,
+                    release TEXT,
+                    rating INTEGER,
+                    thumbnail TEXT,
+                    feature TEXT,
+                    size INTEGER,
+                    mtime INTEGER
+                )""")
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(dirs)")]
+            if columns and "covers" not in columns:
+                # 旧版本的目录状态没有封面列表，丢弃后由下一次扫描重建
+                self.conn.execute("DROP TABLE dirs")
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS dirs (
+                    path TEXT PRIMARY KEY,
+                    mtime INTEGER,
+                    cover_mtime INTEGER,
+                    subdirs TEXT,
+                    covers TEXT
+                )""")
+
+    def load(self):
+        """按加入顺序返回视频信息列表。"""
+        return [video for video, _ in self.load_records()]
+
+    def load_records(self):
+        """按加入顺序返回 [(视频信息, (文件大小, 修改时间)), ...]。"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT path, name, tags, actors, series, release, rating,"
+                " thumbnail, feature, size, mtime FROM videos ORDER BY seq"
+            ).fetchall()
+        return [
+            (
+                (path, name, json.loads(tags), json.loads(actors), *rest),
+                (size, mtime),
+            )
+            for path, name, tags, actors, *rest, size, mtime in rows
+        ]
+
+    def load_dirs(self):
+        """返回 {目录: (修改时间, cover 子目录修改时间, [子目录...], {封面名: 文件名})}。"""
+        with self.lock:
+            rows = self.conn.execute("SELECT * FROM dirs").fetchall()
+        return {
+            path: (mtime, cover_mtime, json.loads(subdirs), json.loads(covers))
+            for path, mtime, cover_mtime, subdirs, covers in rows
+        }
+
+    def apply_scan(self, dirs, upserts, removed):
+        """写入一次扫描的结果：删除消失的视频，新增或更新变化的视频，替换目录状态。"""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "DELETE FROM videos WHERE path = ?", [(path,) for path in removed]
+            )
+            (next_seq,) = self.conn.execute(
+                "SELECT COALESCE(MAX(seq), -1) + 1 FROM videos"
+            ).fetchone()
+            self.conn.executemany(
+                """INSERT INTO videos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    name = excluded.name,
+                    tags = excluded.tags,
+                    actors = excluded.actors,
+                    series = excluded.series,
+                    release = excluded.release,
+                    rating = excluded.rating,
+                    thumbnail = excluded.thumbnail,
+                    feature = excluded.feature,
+                    size = excluded.size,
+                    mtime = excluded.mtime""",
+                [
+                    (
+                        video[0],
+                        next_seq + i,
+                        video[1],
+                        json.dumps(video[2], ensure_ascii=False),
+                        json.dumps(video[3], ensure_ascii=False),
+                        *video[4:],
+                        size,
+                        mtime,
+                    )
+                    for i, (video, (size, mtime)) in enumerate(upserts)
+                ],
+            )
+            self.conn.execute("DELETE FROM dirs")
+            self.conn.executemany(
+                "INSERT INTO dirs VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        path,
+                        mtime,
+                        cover_mtime,
+                        json.dumps(subdirs, ensure_ascii=False),
+                        json.dumps(covers, ensure_ascii=False),
+                    )
+                    for path, (mtime, cover_mtime, subdirs, covers) in dirs.items()
+                ],
+            )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class LibraryScanner:
+    """
+    与上次扫描的状态比较，找出视频目录中新增、变化和消失的视频。
+    目录修改时间未变时不列目录，直接沿用已知的文件和子目录（仍逐个检查子目录）；
+    变化的目录用 os.scandir 列出，复用 DirEntry 的文件信息，只重新解析
+    (大小, 修改时间, 文件名) 变化的文件；cover 子目录变化时才重新列出该目录，
+    并只为该目录的视频重新匹配封面。
+    各目录在最多 workers 个线程中并发处理（网络共享上耗时主要是逐个目录的往返），
+    结果按 os.walk 的顺序合并。cover 目录、隐藏目录和匹配 exclude 通配符的目录不进入。
+    只读取文件系统，可在后台线程调用。
+    """
+
+    def __init__(self, workers=8, exclude=()):
+        self.workers = max(1, workers)
+        self.exclude = [pattern.lower() for pattern in exclude if pattern]
+        self.stats = {"files": 0, "dirs": 0, "seconds": 0.0}
+
+    def pruned(self, video_dir, path):
+        name = os.path.basename(path)
+        if name.lower() == "cover" or name.startswith("."):
+            return True
+        if not self.exclude:
+            return False
+        rel = os.path.relpath(path, video_dir).replace(os.sep, "/").lower()
+        return any(
+            fnmatch.fnmatchcase(name.lower(), pattern)
+            or fnmatch.fnmatchcase(rel, pattern)
+            for pattern in self.exclude
+        )
+
+    def scan(
+        self, video_dir, known_dirs, known_files, dirty=(), on_chunk=None, cancel=None
+    ):
+        """
+        返回 (目录状态, 新增或变化的记录, 消失的视频路径)。
+        扫描过程中按最终顺序分批调用 on_chunk(records)；cancel（threading.Event）被设置时
+        放弃扫描并返回 None。
+        """
+        start = time.perf_counter()
+        dirty = {norm_path(path) for path in dirty}
+        files_by_dir = defaultdict(list)
+        for path in known_files:
+            files_by_dir[os.path.dirname(path)].append(path)
+
+        def visit(root):
+            old = known_dirs.get(root)
+            if dirty and norm_path(root) in dirty:
+                old = None
+            return self.scan_dir(root, old, known_files, files_by_dir.get(root, ()))
+
+        results = {}
+        children = {}
+        dirs = {}
+        upserts = []
+        seen = set()
+        stack = [video_dir]
+
+        def merge():
+            # 按目录树的先序合并已完成的目录，使记录顺序与单线程扫描一致
+            while stack and stack[-1] in results:
+                root = stack.pop()
+                result = results.pop(root)
+                if not result:
+                    continue
+                state, records, paths = result
+                dirs[root] = state
+                upserts.extend(records)
+                seen.update(paths)
+                stack.extend(reversed(children.pop(root)))
+
+        flushed, flushed_at = 0, start
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = {pool.submit(visit, video_dir): video_dir}
+            while pending:
+                if cancel and cancel.is_set():
+                    for future in pending:
+                        future.cancel()
+                    return None
+                done, _ = wait(
+                    pending, timeout=SCAN_CHUNK_SECONDS, return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    root = pending.pop(future)
+                    result = results[root] = future.result()
+                    if not result:
+                        continue
+                    children[root] = [
+                        subdir
+                        for subdir in result[0][2]
+                        if not self.pruned(video_dir, subdir)
+                    ]
+                    for subdir in children[root]:
+                        pending[pool.submit(visit, subdir)] = subdir
+                merge()
+                now = time.perf_counter()
+                if on_chunk and len(upserts) > flushed:
+                    if (
+                        len(upserts) - flushed >= SCAN_CHUNK
+                        or now - flushed_at >= SCAN_CHUNK_SECONDS
+                    ):
+                        on_chunk(upserts[flushed:])
+                        flushed, flushed_at = len(upserts), now
+        if on_chunk and len(upserts) > flushed:
+            on_chunk(upserts[flushed:])
+        removed = [path for path in known_files if path not in seen]
+        self.stats = {
+            "files": len(seen),
+            "dirs": len(dirs),
+            "seconds": time.perf_counter() - start,
+        }
+        return dirs, upserts, removed
+
+    def scan_dir(self, root, old, known_files, known_paths):
+        """处理一个目录，返回 (目录状态, 新增或变化的记录, 目录中的视频路径)，目录不可读时返回 None。"""
+
+        def dir_mtime(path):
+            try:
+                return os.stat(path).st_mtime_ns
+            except OSError:
+                return None
+
+        mtime = dir_mtime(root)
+        if mtime is None:
+            return None
+        cover_mtime = dir_mtime(os.path.join(root, "cover"))
+        covers_changed = not old or old[1] != cover_mtime
+        if not covers_changed:
+            covers = old[3]
+        elif cover_mtime is None:
+            covers = {}
+        else:
+            covers = list_covers(os.path.join(root, "cover"))
+        records = []
+        if old and old[0] == mtime:
+            subdirs = old[2]
+            paths = list(known_paths)
+            if covers_changed:
+                for path in paths:
+                    video, stat = known_files[path]
+                    thumbnail = self.find_thumbnail(root, covers, video[1], video[8])
+                    if thumbnail != video[7]:
+                        video = video[:7] + (thumbnail,) + video[8:]
+                        records.append((video, stat))
+            return (mtime, cover_mtime, subdirs, covers), records, paths
+        try:
+            with os.scandir(root) as it:
+                entries = list(it)
+        except OSError:
+            return None
+        subdirs = []
+        paths = []
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    # Windows 上 DirEntry.stat() 直接使用列目录时得到的信息，无需额外请求
+                    if not entry.is_symlink() and not (
+                        getattr(entry.stat(), "st_file_attributes", 0)
+                        & FILE_ATTRIBUTE_HIDDEN
+                    ):
+                        subdirs.append(entry.path)
+                    continue
+                if not entry.name.lower().endswith(VIDEO_EXTENSIONS):
+                    continue
+                st = entry.stat()
+            except OSError:
+                continue
+            path = os.path.join(root, entry.name)
+            stat = (st.st_size, st.st_mtime_ns)
+            paths.append(path)
+            known = known_files.get(path)
+            if known and known[1] == stat:
+                if not covers_changed:
+                    continue
+                video = known[0]
+                thumbnail = self.find_thumbnail(root, covers, video[1], video[8])
+                if thumbnail == video[7]:
+                    continue
+                video = video[:7] + (thumbnail,) + video[8:]
+            else:
+                name, tags, actors, series, release, rating, feature = parse_filename(
+                    entry.name
+                )
+                thumbnail = self.find_thumbnail(root, covers, name, feature)
+                video = (
+                    path,
+                    name,
+                    tags,
+                    actors,
+                    series,
+                    release,
+                    rating,
+                    thumbnail,
+                    feature,
+                )
+            records.append((video, stat))
+        return (mtime, cover_mtime, subdirs, covers), records, paths
+
+    def find_thumbnail(self, root, covers, name, feature=""):
+        # covers 为 list_covers 得到的该目录封面列表；按名称匹配（不区分大小写），其次按特征码
+        found = covers.get(name.lower()) or (feature and covers.get(feature.lower()))
+        if found:
+            return os.path.join(root + "/cover", found)
+        return None  # 无封面
+
+
+class LibraryWatcher:
+    """
+    监视视频目录的变化，合并一段时间内的事件后在后台线程调用 on_change(paths)。
+    安装了 watchdog 时使用系统文件通知，paths 为发生变化的路径集合；
+    否则（或通知不可用，例如部分网络共享）每隔 poll_seconds 调用一次 on_change(None)，
+    由增量扫描只检查各目录的修改时间来发现变化。
+    """
+
+    def __init__(self, video_dir, on_change, poll_seconds):
+        self.on_change = on_change
+        self.poll_seconds = poll_seconds
+        self.cond = threading.Condition()
+        self.paths = set()
+        self.first_event = None
+        self.last_event = None
+        self.stopped = False
+        self.observer = None
+        if Observer:
+            try:
+                observer = Observer()
+                observer.schedule(self, video_dir, recursive=True)
+                observer.start()
+                self.observer = observer
+            except Exception:
+                pass  # 退化为轮询
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def dispatch(self, event):
+        # watchdog 在其线程中回调；目录自身的事件（修改时间、属性变化等）不必处理，
+        # 其中文件的增删会各自产生事件
+        if event.is_directory or event.event_type not in WATCH_EVENT_TYPES:
+            return
+        now = time.monotonic()
+        with self.cond:
+            for path in (event.src_path, getattr(event, "dest_path", "")):
+                if path:
+                    self.paths.add(os.fsdecode(path))
+            if self.first_event is None:
+                self.first_event = now
+            self.last_event = now
+            self.cond.notify()
+
+    def run(self):
+        while True:
+            with self.cond:
+                while True:
+                    if self.stopped:
+                        return
+                    if self.last_event is None:
+                        if self.observer:
+                            self.cond.wait()
+                        elif not self.cond.wait(self.poll_seconds):
+                            paths = None
+                            break
+                        continue
+                    now = time.monotonic()
+                    due = min(
+                        self.last_event + WATCH_DEBOUNCE,
+                        self.first_event + WATCH_MAX_DELAY,
+                    )
+                    if now < due:
+                        self.cond.wait(due - now)
+                        continue
+                    paths, self.paths = self.paths, set()
+                    self.first_event = self.last_event = None
+                    break
+            try:
+                self.on_change(paths)
+            except Exception:
+                pass  # 扫描失败时等待下一次变化
+
+    def stop(self):
+        with self.cond:
+            self.stopped = True
+            self.cond.notify()
+        if self.observer:
+            self.observer.stop()
 
 
 class VideoBrowser:
@@ -32,6 +1805,29 @@ class VideoBrowser:
         self.root.geometry("1200x800")
 
         self.video_dir = None
+        self.config = load_config()
+        self.ui = UiDispatcher(self.root)  # 后台任务把结果交回界面的统一队列
+        self.thumb_cache = None  # 磁盘缩略图缓存，选择目录后创建
+        self.previews = None  # 封面低清预览图，选择目录后创建
+        self.library = None  # 视频目录的持久化索引，选择目录后创建
+        self.scan_lock = threading.Lock()  # 同一时间只进行一次扫描
+        # 上一次扫描后的已知状态 (视频目录, 索引, 目录状态, 路径 -> (记录, 文件状态))，
+        # 之后的扫描直接与它比较，不必每次从索引重新读取
+        self.scan_state = None
+        self.watcher = None  # 视频目录的变化监视，选择目录后创建
+        self.scan_stats = None  # 上一次扫描的文件数、目录数和耗时
+        self.scan_cancel = None  # 进行中的后台扫描的取消标志，同时用于识别过期的结果
+        self.scan_found = 0
+        self.scan_view_stale = False  # 扫描结果已应用但尚未刷新网格
+        self.session = self.config["last_session"] or {}
+        self.snapshot = None  # 启动时先显示的上次首屏瓦片，索引加载后清空
+        self.session_scheduled = False  # 显示快照后已安排 open_session（只安排一次）
+        self.first_tile_ms = None  # 启动到显示首个瓦片的耗时
+        self.photo_cache = PhotoImageCache(self.config["photo_cache_mb"])
+        self.thumb_pool = ThumbnailWorkerPool(
+            self.config["thumb_workers"], self.config["thumb_queue_depth"]
+        )
+        self.process_decoder = ProcessDecoder(self.config["thumb_workers"])
         self.videos = (
             []
         )  # 存储视频信息：(路径, 名称, 标签列表, 演员列表, 系列, 发行时间, 星级, 缩略图路径, 特征码)
@@ -40,13 +1836,28 @@ class VideoBrowser:
         self.all_series = set()  # 所有独特系列
         self.all_ratings = set()  # 所有独特星级
         self.actor_counts = Counter()
+        self.search_index_job = None  # 分批建立搜索索引的 after_idle 任务
+        self.set_videos([])  # 初始化其余统计和倒排表
         self.selected_tags = set()  # 用户选择的标签
         self.selected_actors = set()  # 用户选择的演员
         self.selected_series = set()  # 用户选择的系列
         self.selected_ratings = set()  # 用户选择的星级
+        # 左侧栏各选项的勾选变量，由 display_filters 建立；在此之前（显示快照期间）为空
+        self.tag_vars = {}
+        self.actor_vars = {}
+        self.series_vars = {}
+        self.rating_vars = {}
         self.search_keyword = ""  # 搜索关键词
-        self.grid_size = 330  # 初始网格尺寸（宽度），高度将基于此计算
-        self.font_size = 12
+        # 实时搜索：等待中的 after 任务、上一次的关键词及其结果（用于逐字缩小范围）
+        self.live_search_job = None
+        self.live_settle_job = None
+        self.live_pending = False  # 本轮输入已保存过撤销记录
+        self.live_keyword = None
+        self.live_paths = None
+        self.live_results = []
+        # 初始网格尺寸（宽度），高度将基于此计算
+        self.grid_size = self.session.get("grid_size", 330)
+        self.font_size = self.session.get("font_size", 12)
         self.history = []  # 筛选历史栈
         self.redo_stack = []  # 重做栈
         self.last_canvas_width = 0
@@ -54,6 +1865,8 @@ class VideoBrowser:
         self.selected_videos = set()  # 选中的视频路径
         self.potplayer_path = POTPLAYER_PATH
         self.show_thumbnails = tk.BooleanVar(value=True)
+        self.fuzzy_search = tk.BooleanVar(value=False)
+        self.fuzzy_results = None  # 当前显示的模糊搜索结果（即 current_displayed）
         self.current_displayed = None  # 用于临时显示相似视频等
         self.filtered_videos = []
         self.rendered_count = 0
@@ -63,6 +1876,11 @@ class VideoBrowser:
         self.loading_scheduled = False
         self.scroll_threshold = 0.6  # 降低阈值，以实现“提前”加载
         self.check_delay = 50  # 减小延迟，以更频繁检查
+        self.scroll_samples = deque(
+            maxlen=8
+        )  # (时间, 视口顶端所在行)，用于估算滚动速度
+        self.prefetch_scheduled = False
+        self.prefetched = set()  # 已提交预取的 (封面路径, 宽, 高)
 
         # 自定义颜色
         self.star_color = "red"
@@ -120,6 +1938,21 @@ class VideoBrowser:
         )
         self.batch_btn.pack(side="left", padx=5)
 
+        # 扫描进度与取消按钮，扫描时显示
+        self.scan_frame = tk.Frame(self.filter_inner_frame, bg=self.left_frame_bg)
+        self.scan_bar = ttk.Progressbar(
+            self.scan_frame, mode="indeterminate", length=80
+        )
+        self.scan_bar.pack(side="left")
+        self.scan_label = tk.Label(self.scan_frame, text="", bg=self.left_frame_bg)
+        self.scan_label.pack(side="left", padx=5)
+        tk.Button(
+            self.scan_frame,
+            text="取消",
+            command=self.cancel_scan,
+            bg=self.left_frame_bg,
+        ).pack(side="left")
+
         # 编辑所选按钮（初始pack然后forget）
         self.edit_selected_btn = tk.Button(
             self.filter_inner_frame,
@@ -154,6 +1987,7 @@ class VideoBrowser:
         self.search_entry = tk.Entry(self.filter_inner_frame, width=20)
         self.search_entry.pack(pady=5)
         self.search_entry.bind("<Return>", lambda e: self.apply_filters())
+        self.search_entry.bind("<KeyRelease>", self.on_search_key)
 
         search_btn = tk.Button(
             self.filter_inner_frame,
@@ -162,6 +1996,13 @@ class VideoBrowser:
             bg=self.left_frame_bg,
         )
         search_btn.pack(pady=5)
+        tk.Checkbutton(
+            self.filter_inner_frame,
+            text="模糊搜索（容错，按相似度排列）",
+            variable=self.fuzzy_search,
+            command=self.apply_filters,
+            bg=self.left_frame_bg,
+        ).pack()
 
         # 添加灰色横线
         ttk.Separator(self.filter_inner_frame, orient="horizontal").pack(
@@ -264,11 +2105,11 @@ class VideoBrowser:
         tk.Label(adjust_frame, text="网格尺寸", bg=self.left_frame_bg).pack()
         self.grid_size_scale = tk.Scale(
             adjust_frame,
-            from_=350,
-            to=700,
+            from_=GRID_SIZES[0],
+            to=GRID_SIZES[-1],
             orient="horizontal",
             command=self.update_sizes,
-            resolution=50,
+            resolution=GRID_SIZES[1] - GRID_SIZES[0],
             bg=self.left_frame_bg,
         )
         self.grid_size_scale.set(self.grid_size)
@@ -335,14 +2176,164 @@ class VideoBrowser:
         filemenu.add_command(label="选择视频目录", command=self.select_directory)
         filemenu.add_command(label="选项", command=self.open_options)
         filemenu.add_separator()
-        filemenu.add_command(label="退出", command=self.root.quit)
+        filemenu.add_command(label="退出", command=self.on_close)
         menubar.add_cascade(label="文件", menu=filemenu)
+        self.query_menu = tk.Menu(menubar, tearoff=0)
+        self.update_query_menu()
+        menubar.add_cascade(label="查询", menu=self.query_menu)
         self.root.config(menu=menubar)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        self.restore_session()
+
+    def restore_session(self):
+        """
+        恢复上次关闭时的筛选、排序和视频目录。
+        首屏先用快照中的瓦片显示（画布首次得到尺寸时绘制），随后再加载索引并开始扫描。
+        """
+        session = self.session
+        self.search_entry.insert(0, session.get("search_text", ""))
+        self.search_keyword = self.search_entry.get().strip().lower()
+        self.selected_tags = set(session.get("selected_tags", ()))
+        self.selected_actors = set(session.get("selected_actors", ()))
+        self.selected_series = set(session.get("selected_series", ()))
+        self.selected_ratings = set(session.get("selected_ratings", ()))
+        self.sort_var.set(session.get("sort_option", self.sort_var.get()))
+        self.actor_sort_var.set(session.get("actor_sort", self.actor_sort_var.get()))
+        video_dir = session.get("video_dir")
+        if not video_dir or not os.path.isdir(video_dir):
+            return
+        self.video_dir = video_dir
+        self.open_thumb_cache()
+        try:
+            with open(
+                os.path.join(get_cache_dir(video_dir), "snapshot.json"),
+                "r",
+                encoding="utf-8",
+            ) as f:
+                self.snapshot = [tuple(video) for video in json.load(f)]
+        except (OSError, ValueError, TypeError):
+            self.snapshot = None
+        if not self.snapshot:
+            self.snapshot = None
+            self.root.after_idle(self.open_session)
+
+    def open_session(self):
+        # 首屏显示后加载完整索引，之后与选择目录时相同
+        self.snapshot = None
+        self.open_library_index()
+        self.set_videos(self.library.load() if self.library else [])
+        self.schedule_search_index()
+        self.start_scan()
+        self.start_watcher()
+        self.display_filters()
+        self.display_videos(keep_scroll=True)
+
+    def save_session(self):
+        if not self.video_dir:
+            return
+        scroll = self.canvas.yview()[0]
+        tiles = self.filtered_videos[: self.rendered_count]
+        if self.current_displayed is not None:
+            tiles = []  # 相似视频等临时列表不作为首屏
+        if len(tiles) > SNAPSHOT_MAX_TILES:
+            tiles, scroll = tiles[:SNAPSHOT_MAX_TILES], 0.0
+        self.config["last_session"] = {
+            "video_dir": self.video_dir,
+            "search_text": self.search_entry.get(),
+            "selected_tags": sorted(self.selected_tags),
+            "selected_actors": sorted(self.selected_actors),
+            "selected_series": sorted(self.selected_series),
+            "selected_ratings": sorted(self.selected_ratings),
+            "sort_option": self.sort_var.get(),
+            "actor_sort": self.actor_sort_var.get(),
+            "grid_size": self.grid_size,
+            "font_size": self.font_size,
+            "scroll": scroll if tiles else 0.0,
+        }
+        save_config(self.config)
+        try:
+            with open(
+                os.path.join(get_cache_dir(self.video_dir), "snapshot.json"),
+                "w",
+                encoding="utf-8",
+            ) as f:
+                json.dump(tiles, f, ensure_ascii=False)
+        except OSError:
+            pass
+
+    def record_first_tile(self):
+        if self.first_tile_ms is None:
+            self.first_tile_ms = (time.perf_counter() - START_TIME) * 1000
+
+    def on_close(self):
+        self.save_session()
+        self.cancel_scan()
+        self.stop_watcher()
+        if self.previews:
+            self.previews.save()
+        self.process_decoder.shutdown()
+        self.root.destroy()
 
     def on_scroll_y(self, *args):
         self.canvas.yview(*args)
+        self.update_thumb_viewport()
+        self.track_scroll()
         self.schedule_check()
 
+    def update_thumb_viewport(self):
+        # 根据滚动位置估算当前可见的行范围，供解码队列排序
+        rows = -(-self.rendered_count // self.cols)
+        if rows:
+            top, bottom = self.canvas.yview()
+            self.thumb_pool.set_viewport(int(top * rows), int(bottom * rows))
+
+    def track_scroll(self):
+        # 记录滚动位置并启动预取循环
+        rows = -(-self.rendered_count // self.cols)
+        self.scroll_samples.append((time.monotonic(), self.canvas.yview()[0] * rows))
+        if not self.prefetch_scheduled:
+            self.prefetch_scheduled = True
+            self.root.after(PREFETCH_INTERVAL, self.prefetch_tick)
+
+    def scroll_velocity(self):
+        """最近的滚动速度（行/秒），向下为正。"""
+        if len(self.scroll_samples) < 2:
+            return 0.0
+        (t0, row0), (t1, row1) = self.scroll_samples[0], self.scroll_samples[-1]
+        return (row1 - row0) / (t1 - t0) if t1 > t0 else 0.0
+
+    def prefetch_tick(self):
+        # 空闲优先级：用户停止滚动后退出；有瓦片解码排队时本轮让位
+        self.prefetch_scheduled = False
+        if not self.scroll_samples:
+            return
+        if time.monotonic() - self.scroll_samples[-1][0] > PREFETCH_IDLE_STOP:
+            self.scroll_samples.clear()
+            return
+        if self.thumb_pool.pending(background=False) == 0:
+            self.prefetch_ahead()
+        self.prefetch_scheduled = True
+        self.root.after(PREFETCH_INTERVAL, self.prefetch_tick)
+
+    def prefetch_ahead(self):
+        # 为尚未渲染、按当前速度即将滚到的行预先解码封面，放入内存缓存
+        velocity = self.scroll_velocity()
+        if velocity <= 0 or not self.show_thumbnails.get():
+            return
+        rows = min(PREFETCH_MAX_ROWS, 1 + int(velocity * PREFETCH_LOOKAHEAD))
+        start = self.rendered_count
+        end = min(len(self.filtered_videos), start + rows * self.cols)
+        w, h = thumb_size(self.grid_size)
+        for i in range(start, end):
+            thumbnail = self.filtered_videos[i][7]
+            key = (thumbnail, w, h)
+            if not thumbnail or key in self.prefetched or key in self.photo_cache:
+                continue
+            self.prefetched.add(key)
+            row = self.current_row + 1 + (i - start) // self.cols
+            self.thumb_pool.submit(row, self.prefetch_thumb_thread, thumbnail, w, h)
+
     def set_potplayer_path(self):
         self.potplayer_path = self.potplayer_entry.get().strip()
         messagebox.showinfo("路径更新", "PotPlayer 路径已更新。")
@@ -365,6 +2356,8 @@ class VideoBrowser:
             if direction > 0 and current_view[1] >= 1:
                 return
             self.canvas.yview_scroll(direction, "units")
+            self.update_thumb_viewport()
+            self.track_scroll()
             self.schedule_check()
 
         # 递归绑定左侧内帧的所有子部件
@@ -564,7 +2557,7 @@ class VideoBrowser:
     def open_options(self):
         options_win = tk.Toplevel(self.root)
         options_win.title("选项")
-        options_win.geometry("300x250")
+        options_win.geometry("300x680")
         options_win.grab_set()  # 模态窗口
 
         # 星级颜色
@@ -595,10 +2588,131 @@ class VideoBrowser:
         )
         actor_fg_btn.pack()
 
+        # 缩略图缓存上限
+        tk.Label(options_win, text="缩略图缓存上限 (MB)").pack(pady=5)
+        self.cache_mb_var = tk.IntVar(value=self.config["thumb_cache_mb"])
+        tk.Spinbox(
+            options_win,
+            from_=16,
+            to=65536,
+            increment=64,
+            textvariable=self.cache_mb_var,
+            width=10,
+        ).pack()
+
+        # 封面解码线程数与队列上限
+        tk.Label(options_win, text="封面解码线程数").pack(pady=5)
+        self.workers_var = tk.IntVar(value=self.config["thumb_workers"])
+        tk.Spinbox(
+            options_win, from_=1, to=32, textvariable=self.workers_var, width=10
+        ).pack()
+        tk.Label(options_win, text="解码队列上限").pack(pady=5)
+        self.queue_depth_var = tk.IntVar(value=self.config["thumb_queue_depth"])
+        tk.Spinbox(
+            options_win,
+            from_=16,
+            to=4096,
+            increment=16,
+            textvariable=self.queue_depth_var,
+            width=10,
+        ).pack()
+
+        # 封面解码方式
+        tk.Label(options_win, text="封面解码方式").pack(pady=5)
+        backend_names = {v: k for k, v in DECODE_BACKENDS.items()}
+        self.backend_var = tk.StringVar(
+            value=DECODE_BACKENDS[self.config["decode_backend"]]
+        )
+        tk.OptionMenu(options_win, self.backend_var, *backend_names).pack()
+        self.backend_names = backend_names
+
+        # 缩略图缓存存储方式
+        self.pack_var = tk.BooleanVar(value=self.config["thumb_pack"])
+        tk.Checkbutton(
+            options_win, text="缩略图缓存打包为单个文件", variable=self.pack_var
+        ).pack(pady=5)
+
+        # 目录变化监视
+        self.watch_var = tk.BooleanVar(value=self.config["watch_library"])
+        tk.Checkbutton(
+            options_win, text="自动监视目录变化", variable=self.watch_var
+        ).pack(pady=5)
+        tk.Label(
+            options_win,
+            text="轮询间隔 (秒)" + ("" if Observer else "（未安装 watchdog）"),
+        ).pack()
+        self.watch_poll_var = tk.IntVar(value=self.config["watch_poll_seconds"])
+        tk.Spinbox(
+            options_win, from_=2, to=600, textvariable=self.watch_poll_var, width=10
+        ).pack()
+
+        # 目录扫描
+        tk.Label(options_win, text="目录扫描并发数").pack(pady=5)
+        self.scan_workers_var = tk.IntVar(value=self.config["scan_workers"])
+        tk.Spinbox(
+            options_win, from_=1, to=64, textvariable=self.scan_workers_var, width=10
+        ).pack()
+        tk.Label(options_win, text="扫描时跳过的目录 (通配符，逗号分隔)").pack(pady=5)
+        self.scan_exclude_var = tk.StringVar(
+            value=", ".join(self.config["scan_exclude"])
+        )
+        tk.Entry(options_win, textvariable=self.scan_exclude_var, width=30).pack()
+        if self.first_tile_ms is not None:
+            tk.Label(
+                options_win,
+                text=f"本次启动到显示首个瓦片：{self.first_tile_ms:.0f} ms",
+                fg="gray",
+            ).pack()
+        if self.scan_stats:
+            stats = self.scan_stats
+            tk.Label(
+                options_win,
+                text=(
+                    f"上次扫描：{stats['files']} 个视频 / {stats['dirs']} 个目录，"
+                    f"{stats['seconds']:.2f} 秒"
+                    f"（{stats['files'] / max(stats['seconds'], 1e-6):.0f} 文件/秒）"
+                ),
+                fg="gray",
+            ).pack()
+
+        # 封面缩放质量
+        tk.Label(options_win, text="封面缩放质量").pack(pady=5)
+        quality_names = {v[0]: k for k, v in THUMB_QUALITIES.items()}
+        self.quality_var = tk.StringVar(
+            value=THUMB_QUALITIES[self.config["thumb_quality"]][0]
+        )
+        tk.OptionMenu(options_win, self.quality_var, *quality_names).pack()
+        self.quality_names = quality_names
+
+        # 内存缩略图缓存上限及统计
+        tk.Label(options_win, text="内存缩略图缓存上限 (MB)").pack(pady=5)
+        self.photo_cache_mb_var = tk.IntVar(value=self.config["photo_cache_mb"])
+        tk.Spinbox(
+            options_win,
+            from_=16,
+            to=8192,
+            increment=32,
+            textvariable=self.photo_cache_mb_var,
+            width=10,
+        ).pack()
+        stats = self.photo_cache.stats()
+        tk.Label(
+            options_win,
+            text=(
+                f"命中 {stats['hits']} / 未命中 {stats['misses']} / "
+                f"淘汰 {stats['evictions']}（{stats['count']} 张，{stats['mb']:.1f} MB）"
+            ),
+            fg="gray",
+        ).pack()
+
         close_btn = tk.Button(
             options_win, text="关闭", command=lambda: self.close_options(options_win)
         )
         close_btn.pack(pady=10)
+        options_win.update_idletasks()
+        options_win.geometry(
+            f"{max(300, options_win.winfo_reqwidth())}x{options_win.winfo_reqheight()}"
+        )
 
     def choose_color(self, color_type):
         color = colorchooser.askcolor()[1]
@@ -614,113 +2728,830 @@ class VideoBrowser:
             self.display_videos()  # 刷新显示
 
     def close_options(self, win):
+        try:
+            self.config["thumb_cache_mb"] = max(16, self.cache_mb_var.get())
+        except tk.TclError:
+            pass  # 输入非数字时保留原值
+        if self.pack_var.get() != self.config["thumb_pack"]:
+            self.config["thumb_pack"] = self.pack_var.get()
+            if self.video_dir:
+                self.open_thumb_cache()
+        if self.thumb_cache:
+            self.thumb_cache.set_budget(self.config["thumb_cache_mb"])
+        try:
+            self.config["photo_cache_mb"] = max(16, self.photo_cache_mb_var.get())
+        except tk.TclError:
+            pass
+        self.photo_cache.set_budget(self.config["photo_cache_mb"])
+        quality = self.quality_names[self.quality_var.get()]
+        if quality != self.config["thumb_quality"]:
+            self.config["thumb_quality"] = quality
+            self.photo_cache.clear()  # 内存中的缩略图按旧质量解码，需重新生成
+        try:
+            self.config["thumb_workers"] = max(1, self.workers_var.get())
+            self.config["thumb_queue_depth"] = max(16, self.queue_depth_var.get())
+        except tk.TclError:
+            pass
+        self.thumb_pool.resize(
+            self.config["thumb_workers"], self.config["thumb_queue_depth"]
+        )
+        self.config["decode_backend"] = self.backend_names[self.backend_var.get()]
+        self.process_decoder.resize(self.config["thumb_workers"])
+        try:
+            self.config["scan_workers"] = max(1, self.scan_workers_var.get())
+        except tk.TclError:
+            pass
+        self.config["scan_exclude"] = [
+            p.strip() for p in self.scan_exclude_var.get().split(",") if p.strip()
+        ]
+        watch = (self.config["watch_library"], self.config["watch_poll_seconds"])
+        self.config["watch_library"] = self.watch_var.get()
+        try:
+            self.config["watch_poll_seconds"] = max(2, self.watch_poll_var.get())
+        except tk.TclError:
+            pass
+        if watch != (self.config["watch_library"], self.config["watch_poll_seconds"]):
+            self.start_watcher()
+        save_config(self.config)
         win.destroy()
         self.display_videos()  # 刷新显示
 
     def select_directory(self):
-        self.video_dir = filedialog.askdirectory(title="选择视频目录")
-        if self.video_dir:
-            self.load_videos()
+        video_dir = filedialog.askdirectory(title="选择视频目录")
+        if video_dir:  # 取消对话框时保留当前目录
+            self.video_dir = video_dir
+            self.open_thumb_cache()
+            self.open_library_index()
+            # 先用索引中的数据立即显示，再在后台增量扫描文件系统
+            self.set_videos(self.library.load() if self.library else [])
+            self.schedule_search_index()
+            self.start_scan()
+            self.start_watcher()
             self.display_filters()
             self.display_videos()
 
+    def open_library_index(self):
+        self.stop_watcher()
+        if self.library:
+            self.library.close()
+        try:
+            self.library = LibraryIndex(get_cache_dir(self.video_dir))
+        except (OSError, sqlite3.Error):
+            self.library = None  # 索引不可用时每次都完整扫描
+
+    def start_watcher(self):
+        self.stop_watcher()
+        if not self.video_dir or not self.config["watch_library"]:
+            return
+        video_dir, library = self.video_dir, self.library
+
+        def on_change(paths):
+            # 在监视线程中增量扫描，只把结果交给主线程
+            if paths is None:
+                # 轮询模式没有变化路径：检查内存中的缩略图对应的封面是否被原地替换
+                paths = self.photo_cache.stale_paths()
+            dirty = set()
+            for path in paths or ():
+                parent = os.path.dirname(path)
+                dirty.update((path, parent))
+                if os.path.basename(parent).lower() == "cover":
+                    dirty.add(os.path.dirname(parent))
+            upserts, removed = self.rescan_library(video_dir, library, dirty)
+            if upserts or removed or paths:
+                self.ui.post(
+                    self.apply_watched_changes, library, upserts, removed, paths
+                )
+
+        self.watcher = LibraryWatcher(
+            video_dir, on_change, self.config["watch_poll_seconds"]
+        )
+
+    def stop_watcher(self):
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+
+    def apply_watched_changes(self, library, upserts, removed, paths):
+        if library is not self.library:
+            return  # 已切换目录
+        # 被原地替换的封面：丢弃内存中按路径缓存的旧图（磁盘缓存按文件状态区分，无需处理）。
+        # 通知中的路径与记录中的写法（大小写、分隔符）可能不同，统一后再比较
+        changed = {norm_path(path) for path in paths or ()}
+        replaced = False
+        if changed:
+            shown = {v[7] for v in self.filtered_videos[: self.rendered_count] if v[7]}
+            for cover in self.photo_cache.paths() | shown:
+                if norm_path(cover) not in changed:
+                    continue
+                self.photo_cache.invalidate(cover)
+                if self.previews:
+                    self.previews.invalidate(cover)
+                replaced = replaced or cover in shown
+        if self.apply_video_changes(upserts, removed):
+            self.display_filters()
+            self.display_videos(keep_scroll=True)
+        elif replaced:
+            self.display_videos(keep_scroll=True)
+
+    def open_thumb_cache(self):
+        if self.thumb_cache:
+            self.thumb_cache.close()
+        if self.previews:
+            self.previews.save()
+        store = ThumbnailPackStore if self.config["thumb_pack"] else ThumbnailCache
+        try:
+            self.thumb_cache = store(
+                get_cache_dir(self.video_dir), self.config["thumb_cache_mb"]
+            )
+            self.previews = PreviewStore(get_cache_dir(self.video_dir))
+        except OSError:
+            self.thumb_cache = None  # 缓存目录不可用时退化为不缓存
+            self.previews = None
+
     def refresh_directory(self):
         if self.video_dir:
-            self.load_videos()
+            self.photo_cache.clear()  # 刷新时重新读取封面，以反映被替换的封面文件
+            if self.previews:
+                self.previews.save()
+            self.start_scan(relist=True)
             self.display_filters()
             self.display_videos()
 
-    def load_videos(self):
-        self.videos = []
+    def start_scan(self, relist=False):
+        """
+        在后台线程增量扫描视频目录，结果按最终顺序分批交给主线程应用，期间显示进度并可取消。
+        每批在主线程的一次回调中完整应用，筛选和显示不会看到只更新了一半的统计。
+        relist 见 rescan_library（用户点击刷新时使用）。
+        """
+        if self.scan_cancel:
+            self.scan_cancel.set()  # 旧扫描的结果作废
+        if not self.library:
+            self.set_videos([])  # 没有索引时每次都完整扫描
+        video_dir, library = self.video_dir, self.library
+        cancel = self.scan_cancel = threading.Event()
+        self.scan_found = 0
+        self.scan_view_stale = False
+        self.scan_label.config(text="扫描中…")
+        self.scan_frame.pack(pady=5, before=self.search_entry)
+        self.scan_bar.start(50)
+
+        def run():
+            result = self.rescan_library(
+                video_dir,
+                library,
+                relist=relist,
+                on_chunk=lambda records: self.ui.post(
+                    self.apply_scan_chunk, cancel, records
+                ),
+                cancel=cancel,
+            )
+            self.ui.post(self.finish_scan, cancel, result)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def cancel_scan(self):
+        if self.scan_cancel:
+            self.scan_cancel.set()
+
+    def apply_scan_chunk(self, cancel, records):
+        if cancel is not self.scan_cancel or cancel.is_set():
+            return  # 已取消或已开始新的扫描
+        self.scan_found += len(records)
+        self.scan_label.config(text=f"扫描中… 已发现 {self.scan_found} 个变化")
+        by_path = self.videos_by_path
+        fresh = [video for video, _ in records if video[0] not in by_path]
+        if not self.apply_video_changes(records, []):
+            return
+        # 扫描中只做追加：新的筛选选项接在各栏末尾，符合条件的新视频接在网格末尾；
+        # 已有视频的变化和需要重新排序的结果留到扫描结束后整体刷新一次
+        self.append_filter_options(fresh)
+        if len(fresh) < len(records) or not self.append_scanned_videos(fresh):
+            self.scan_view_stale = True
+        if self.scan_view_stale and not self.rendered_count:
+            # 网格还是空的（例如首次扫描）：立即显示，不必等到扫描结束
+            self.scan_view_stale = False
+            self.display_videos(keep_scroll=True)
+
+    def append_scanned_videos(self, videos):
+        """
+        把扫描中新发现的视频按当前筛选条件追加到网格末尾，已有的瓦片保持不动。
+        新视频在库中排在最后，只有不排序时追加后的顺序才与重新筛选一致；否则返回 False。
+        """
+        if self.current_displayed is not None:
+            return True  # 自定义显示列表不受新视频影响
+        if self.snapshot is not None or self.sort_var.get() != "无":
+            return False
+        paths = set()
+        for path, _, tags, actors, series, _, rating, _, _ in videos:
+            if (
+                (self.selected_tags and self.selected_tags.isdisjoint(tags))
+                or (self.selected_actors and self.selected_actors.isdisjoint(actors))
+                or (self.selected_series and series not in self.selected_series)
+                or (self.selected_ratings and rating not in self.selected_ratings)
+            ):
+                continue
+            paths.add(path)
+        if self.search_keyword and paths:
+            paths = self.query_paths(parse_query(self.search_keyword), paths)
+        self.filtered_videos.extend(video for video in videos if video[0] in paths)
+        self.schedule_check()  # 可见区域未排满时接着渲染
+        return True
+
+    def finish_scan(self, cancel, result):
+        if cancel is not self.scan_cancel:
+            return  # 已开始新的扫描
+        self.scan_cancel = None
+        self.scan_bar.stop()
+        self.scan_frame.pack_forget()
+        removed = bool(result) and self.apply_video_changes([], result[1])
+        if self.scan_found or removed:
+            self.display_filters()  # 扫描中追加的选项未按顺序排列，结束时统一重建一次
+        if self.scan_view_stale or removed:
+            self.scan_view_stale = False
+            self.display_videos(keep_scroll=True)
+
+    def rescan_library(
+        self, video_dir, library, dirty=(), on_chunk=None, cancel=None, relist=False
+    ):
+        """
+        增量扫描并写入索引，返回 (新增或变化的记录, 消失的视频路径)，取消时返回 None。
+        dirty 中的目录即使修改时间未变也重新列出（文件被原地改写时目录时间不变）。
+        relist 为真时不按修改时间跳过任何目录：部分文件系统（FAT/exFAT、一些 SMB 服务器）
+        添加文件时不更新目录的修改时间，变化也可能落在时间精度之内，只靠修改时间会永远看不到；
+        未变化的文件仍按大小和修改时间沿用已有记录，不重新解析。
+        可在后台线程调用，on_chunk 和 cancel 见 LibraryScanner.scan。
+        """
+        with self.scan_lock:
+            state = self.scan_state
+            if state and state[0] == video_dir and state[1] is library:
+                known_dirs, known_files = state[2], state[3]
+            else:
+                known_dirs, known_files = {}, {}
+                if library:
+                    # 本会话首次扫描这个索引：从索引读取上次的状态
+                    try:
+                        known_dirs = library.load_dirs()
+                        known_files = dict(
+                            (video[0], (video, stat))
+                            for video, stat in library.load_records()
+                        )
+                    except sqlite3.Error:
+                        library = None  # 索引已关闭（切换了目录）
+            scanner = LibraryScanner(
+                self.config["scan_workers"], self.config["scan_exclude"]
+            )
+            result = scanner.scan(
+                video_dir,
+                {} if relist else known_dirs,
+                known_files,
+                dirty,
+                on_chunk,
+                cancel,
+            )
+            if result is None:
+                return None
+            dirs, upserts, removed = result
+            self.scan_stats = scanner.stats
+            if library and (upserts or removed or dirs != known_dirs):
+                try:
+                    library.apply_scan(dirs, upserts, removed)
+                except sqlite3.Error:
+                    pass
+            for video, stat in upserts:
+                known_files[video[0]] = (video, stat)
+            for path in removed:
+                known_files.pop(path, None)
+            self.scan_state = (video_dir, library, dirs, known_files)
+        return upserts, removed
+
+    def apply_video_changes(self, upserts, removed):
+        """
+        把扫描结果作为增量应用到 self.videos 和各项统计，重复应用结果不变。
+        变化的视频原位替换，新视频追加到末尾（与索引中的顺序一致）。
+        """
+        changed = {video[0]: video for video, _ in upserts}
+        removed = set(removed)
+        self.live_keyword = None  # 库已变化，实时搜索不能只在上一次的结果中缩小范围
+        by_path = self.videos_by_path
+        old = {p: by_path[p] for p in changed.keys() | removed if p in by_path}
+        if not old:
+            if not changed:
+                return False
+            # 只有新视频（例如首次扫描的每一批）：直接追加，无需遍历整个列表
+            self.videos.extend(changed.values())
+        else:
+            for video in old.values():
+                self.remove_video_stats(video)
+            videos = [changed.get(v[0], v) for v in self.videos if v[0] not in removed]
+            videos.extend(v for path, v in changed.items() if path not in old)
+            self.videos = videos
+        for path in removed:
+            by_path.pop(path, None)
+            self.video_seq.pop(path, None)
+        for path, video in changed.items():
+            if path not in removed:
+                if path not in self.video_seq:
+                    self.video_seq[path] = self.next_video_seq
+                    self.next_video_seq += 1
+                self.add_video_stats(video)
+                by_path[path] = video
+        return True
+
+    def filter_videos(self, sort_option=None):
+        """
+        按当前筛选条件返回视频，保持库中的顺序。
+        同一类条件之间取并集、不同类之间取交集，用倒排表做集合运算，
+        耗时只与涉及的视频数有关，与库的大小无关。
+        给出 COLUMN_SORTS 中的排序选项时（需要 NumPy）在列式副本上筛选和排序：
+        星级勾选与查询中的星级、年份条件用掩码，排序用 argsort，返回按需取元组的 ColumnView。
+        """
+        use_columns = sort_option is not None
+        candidates = None
+        for selected, postings in (
+            (self.selected_tags, self.tag_postings),
+            (self.selected_actors, self.actor_postings),
+            (self.selected_series, self.series_postings),
+            (() if use_columns else self.selected_ratings, self.rating_postings),
+        ):
+            if not selected:
+                continue
+            union = set().union(*(postings.get(key, ()) for key in selected))
+            candidates = union if candidates is None else candidates & union
+            if not candidates:
+                return []
+        ranges = ()
+        if self.search_keyword:
+            terms = parse_query(self.search_keyword)
+            if use_columns:
+                # 星级、年份条件留给列掩码，倒排表只处理其余条件
+                ranges = [t for t in terms if t.field in QUERY_RANGE_FIELDS]
+                terms = [t for t in terms if t.field not in QUERY_RANGE_FIELDS]
+            candidates = self.query_paths(terms, candidates)
+        if use_columns:
+            return self.sorted_by_columns(
+                candidates, sort_option, ranges, self.selected_ratings
+            )
+        if candidates is None:
+            videos = list(self.videos)
+        else:
+            by_path = self.videos_by_path
+            videos = [
+                by_path[path]
+                for path in sorted(candidates, key=self.video_seq.__getitem__)
+            ]
+        return videos if sort_option is None else self.sort_videos(videos, sort_option)
+
+    def term_postings(self, term):
+        """查询项涉及的倒排表（命中其中任一个即满足该项）；关键词项返回 None。"""
+        if term.field is None:
+            return None
+        if term.field in QUERY_SET_FIELDS:
+            postings = getattr(self, f"{term.field}_postings")
+            # 标签、演员、系列不区分大小写；取值很少，直接遍历
+            return [
+                paths for key, paths in postings.items() if key.lower() in term.values
+            ]
+        postings = (
+            self.rating_postings if term.field == "rating" else self.year_postings
+        )
+        low = -float("inf") if term.low is None else term.low
+        high = float("inf") if term.high is None else term.high
+        return [paths for key, paths in postings.items() if low <= key <= high]
+
+    def query_paths(self, terms, candidates=None, explain=None):
+        """
+        返回满足全部查询项的视频路径（candidates 为 None 时在全部视频中查找）。
+        执行顺序由倒排表的大小决定：包含项按估计命中数从少到多求交，第一项才展开成集合，
+        之后只检查已有候选是否在该项的倒排表中，候选为空时立即结束；
+        关键词项在倒排表筛过之后再逐个确认，排除项最后从结果中去掉。
+        explain 为列表时追加每一步的 (查询项原文, 估计命中数, 剩余候选数, 耗时毫秒)。
+        """
+        plan = []
+        for term in terms:
+            postings = self.term_postings(term)
+            if postings is None:
+                estimate = len(self.search_fields)  # 关键词无法预估，排在倒排表之后
+            else:
+                estimate = sum(len(paths) for paths in postings)
+            plan.append((term.negate, postings is None, estimate, term, postings))
+        plan.sort(key=lambda step: step[:3])
+        pool = candidates
+        for negate, _, estimate, term, postings in plan:
+            start = time.perf_counter()
+            if pool is not None and not pool:
+                pass  # 已经没有候选
+            elif negate:
+                if pool is None:
+                    pool = set(self.search_fields)
+                if postings is None:
+                    pool = pool - self.search_paths(term.values[0], pool)
+                else:
+                    pool = pool.difference(*postings)
+            elif postings is None:
+                pool = self.search_paths(term.values[0], pool)
+            elif pool is None:
+                pool = set().union(*postings)
+            elif len(postings) == 1:
+                pool = pool & postings[0]
+            else:
+                pool = {path for path in pool if any(path in p for p in postings)}
+            if explain is not None:
+                elapsed = (time.perf_counter() - start) * 1000
+                explain.append((term.text, estimate, len(pool), elapsed))
+        return pool
+
+    def explain_query(self):
+        """显示当前查询的执行步骤：每一项的估计命中数、执行后剩余的候选数和耗时。"""
+        text = self.search_entry.get().strip().lower()
+        if not text:
+            messagebox.showinfo(
+                "解释查询",
+                "搜索框为空。\n查询示例：tag:a,b -actor:c rating>=4 "
+                'year:2019..2022 series:"x y" 关键词',
+            )
+            return
+        start = time.perf_counter()
+        terms = parse_query(text)
+        steps = []
+        paths = self.query_paths(terms, explain=steps)
+        total = (time.perf_counter() - start) * 1000
+        lines = ["按执行顺序（估计命中数 → 剩余候选数，耗时）："]
+        for term_text, estimate, remaining, elapsed in steps:
+            lines.append(f"{term_text}：{estimate} → {remaining}，{elapsed:.2f} ms")
+        count = len(self.videos) if paths is None else len(paths)
+        lines.append(
+            f"共 {count} 个视频，总耗时 {total:.2f} ms（未计入左侧勾选的筛选）"
+        )
+        if NUMPY_AVAILABLE and any(t.field in QUERY_RANGE_FIELDS for t in terms):
+            lines.append("实际显示时，星级、年份条件在列式副本上用掩码筛选")
+        messagebox.showinfo("解释查询", "\n".join(lines))
+
+    def save_query(self):
+        text = self.search_entry.get().strip()
+        if not text:
+            messagebox.showinfo("保存查询", "搜索框为空")
+            return
+        name = simpledialog.askstring(
+            "保存查询", "查询名称：", initialvalue=text, parent=self.root
+        )
+        if not name:
+            return
+        self.config["saved_queries"] = {**self.config["saved_queries"], name: text}
+        save_config(self.config)
+        self.update_query_menu()
+
+    def delete_query(self, name):
+        saved = dict(self.config["saved_queries"])
+        saved.pop(name, None)
+        self.config["saved_queries"] = saved
+        save_config(self.config)
+        self.update_query_menu()
+
+    def run_saved_query(self, name):
+        self.search_entry.delete(0, tk.END)
+        self.search_entry.insert(0, self.config["saved_queries"][name])
+        self.apply_filters()
+
+    def update_query_menu(self):
+        menu = self.query_menu
+        menu.delete(0, tk.END)
+        menu.add_command(label="保存当前查询…", command=self.save_query)
+        menu.add_command(label="解释当前查询", command=self.explain_query)
+        saved = self.config["saved_queries"]
+        if saved:
+            menu.add_separator()
+            for name in saved:
+                menu.add_command(
+                    label=name, command=lambda n=name: self.run_saved_query(n)
+                )
+            delete_menu = tk.Menu(menu, tearoff=0)
+            for name in saved:
+                delete_menu.add_command(
+                    label=name, command=lambda n=name: self.delete_query(n)
+                )
+            menu.add_cascade(label="删除已存查询", menu=delete_menu)
+
+    @staticmethod
+    def search_parts(video):
+        """参与关键词搜索的字段（小写）：名称、各标签、各演员、系列。"""
+        _, name, tags, actors, series, _, _, _, _ = video
+        return [
+            name.lower(),
+            *(t.lower() for t in tags),
+            *(a.lower() for a in actors),
+            series.lower(),
+        ]
+
+    @staticmethod
+    def trigrams(field):
+        """搜索字段中各部分的字符三元组（不跨越部分之间的分隔符）。"""
+        grams = set()
+        for part in field.split(SEARCH_SEPARATOR):
+            grams.update(part[i : i + 3] for i in range(len(part) - 2))
+        return grams
+
+    def search_paths(self, keyword, candidates=None):
+        """
+        返回名称、标签、演员或系列中包含 keyword 的视频路径（candidates 为 None 时在全部视频中查找）。
+        关键词不少于 3 个字符且三元组倒排表已建完时，先用倒排表求交集得到候选，再逐个确认子串；
+        否则直接在预先小写化的搜索字段中查找。结果与逐字段 `keyword in 字段.lower()` 完全相同。
+        """
+        fields = self.search_fields
+        pool = fields.keys() if candidates is None else candidates
+        if SEARCH_SEPARATOR in keyword:
+            # 关键词含分隔符时可能跨字段误匹配，退回逐字段比较
+            by_path = self.videos_by_path
+            return {
+                path
+                for path in pool
+                if any(keyword in part for part in self.search_parts(by_path[path]))
+            }
+        if len(keyword) >= 3 and not self.search_index_queue:
+            postings = sorted(
+                (
+                    self.trigram_postings.get(keyword[i : i + 3], ())
+                    for i in range(len(keyword) - 2)
+                ),
+                key=len,
+            )
+            if len(postings[0]) < len(pool):
+                pool = set(postings[0]).intersection(*postings[1:])
+                if candidates is not None:
+                    pool &= candidates
+        return {path for path in pool if keyword in fields[path]}
+
+    @staticmethod
+    def fuzzy_words(video):
+        """参与模糊搜索的词（小写）：名称、各演员、系列、特征码中连续的文字或数字。"""
+        _, name, _, actors, series, _, _, _, feature = video
+        text = " ".join((name, *actors, series, feature)).lower()
+        return set(FUZZY_WORD_REGEX.findall(text))
+
+    @staticmethod
+    def bigrams(word):
+        padded = f" {word} "  # 首尾加空格，使开头和结尾的字符也有权重
+        return {padded[i : i + 2] for i in range(len(padded) - 1)}
+
+    def fuzzy_videos(self, query, candidates=None, k=FUZZY_TOP_K):
+        """
+        容错搜索，返回最相似的至多 k 个视频。
+        对查询中的每个词，先在词表的二元组倒排表中统计各个词包含查询二元组的比例
+        （拼错、漏字、多字时仍有较高比例），用堆取出比例最高的一批词，再按 difflib 的相似度细排；
+        视频的得分为各查询词在该视频中最相似的词的相似度之和，最后用堆取前 k 个。
+        词表远小于视频数，且只对少量候选计算相似度，不对全部视频排序。
+        """
+        if self.search_index_queue:
+            self.build_search_index()  # 刚载入库、索引还没分批建完：先建完其余部分
+        matches = []
+        for word in set(FUZZY_WORD_REGEX.findall(query.lower())):
+            grams = self.bigrams(word)
+            counts = Counter()
+            for gram in grams:
+                counts.update(self.term_grams.get(gram, ()))
+            threshold = FUZZY_MIN_SCORE * len(grams)
+            terms = heapq.nlargest(
+                FUZZY_TERMS,
+                ((count, term) for term, count in counts.items() if count >= threshold),
+            )
+            similar = []
+            for _, term in terms:
+                similarity = difflib.SequenceMatcher(None, word, term).ratio()
+                if similarity >= FUZZY_MIN_SCORE:
+                    similar.append((similarity, self.fuzzy_terms[term]))
+            similar.sort(key=lambda match: match[0], reverse=True)
+            matches.append((sum(len(paths) for _, paths in similar), similar))
+        # 命中视频少的词先展开成候选；命中太多的常见词（如特征码前缀）只给已有候选加分
+        matches.sort(key=lambda match: match[0])
+        scores = defaultdict(float)
+        for index, (size, similar) in enumerate(matches):
+            if index == 0 or size <= FUZZY_COMMON:
+                best = {}
+                for similarity, paths in similar:
+                    for path in paths:
+                        best.setdefault(path, similarity)
+                for path, similarity in best.items():
+                    scores[path] += similarity
+            else:
+                for path in scores:
+                    for similarity, paths in similar:
+                        if path in paths:
+                            scores[path] += similarity
+                            break
+        if candidates is not None:
+            hits = (
+                (score, path) for path, score in scores.items() if path in candidates
+            )
+        else:
+            hits = ((score, path) for path, score in scores.items())
+        # 得分相同时按库中的顺序
+        ranked = heapq.nlargest(
+            k, hits, key=lambda hit: (hit[0], -self.video_seq[hit[1]])
+        )
+        return [self.videos_by_path[path] for _, path in ranked]
+
+    def add_fuzzy_terms(self, video):
+        for word in self.fuzzy_words(video):
+            paths = self.fuzzy_terms.get(word)
+            if paths is None:
+                paths = self.fuzzy_terms[word] = set()
+                for gram in self.bigrams(word):
+                    self.term_grams[gram].add(word)
+            paths.add(video[0])
+
+    def remove_fuzzy_terms(self, video):
+        for word in self.fuzzy_words(video):
+            paths = self.fuzzy_terms.get(word)
+            if paths is None:
+                continue
+            paths.discard(video[0])
+            if not paths:
+                del self.fuzzy_terms[word]
+                for gram in self.bigrams(word):
+                    terms = self.term_grams[gram]
+                    terms.discard(word)
+                    if not terms:
+                        del self.term_grams[gram]
+
+    def schedule_search_index(self):
+        if self.search_index_queue and self.search_index_job is None:
+            self.search_index_job = self.root.after_idle(self.search_index_step)
+
+    def search_index_step(self):
+        # 每次空闲只建一批，其间界面照常响应；建完之前关键词搜索逐个比较搜索字段
+        self.search_index_job = None
+        self.build_search_index(SEARCH_INDEX_CHUNK)
+        self.schedule_search_index()
+
+    def build_search_index(self, limit=None):
+        """把队列中（至多 limit 个）尚未建索引的视频建入三元组倒排表和模糊搜索的词表。"""
+        queue = self.search_index_queue
+        for _ in range(len(queue) if limit is None else min(limit, len(queue))):
+            video = queue.popleft()
+            if self.videos_by_path.get(video[0]) is video:  # 排队期间未被替换或删除
+                self.index_search_text(video)
+
+    def index_search_text(self, video):
+        path = video[0]
+        for gram in self.trigrams(self.search_fields[path]):
+            self.trigram_postings[gram].add(path)
+        self.add_fuzzy_terms(video)
+
+    def set_videos(self, videos):
+        self.videos = list(videos)
+        self.live_keyword = None
+        self.videos_by_path = {video[0]: video for video in self.videos}
+        # 视频在库中的先后顺序，用于把倒排表的筛选结果按原顺序排列
+        self.video_seq = {video[0]: i for i, video in enumerate(self.videos)}
+        self.next_video_seq = len(self.videos)
+        # 每个视频预先小写化并拼接的搜索字段，三元组倒排表，
+        # 以及模糊搜索的词表（词 -> 视频路径集合）和词表的二元组倒排表。
+        # 载入整个库时这些索引不在这里一次建完，而是把视频放入队列，由 search_index_step
+        # 在主线程空闲时分批建立；之后增删的视频在队列为空时直接建入
+        self.search_fields = {}
+        self.trigram_postings = defaultdict(set)
+        self.fuzzy_terms = {}
+        self.term_grams = defaultdict(set)
+        self.search_index_queue = deque()
+        self.columns = None  # 列式副本（ColumnStore），首次按列排序时建立
+        # 倒排表：标签/演员/系列/星级 -> 视频路径集合
+        self.tag_postings = defaultdict(set)
+        self.actor_postings = defaultdict(set)
+        self.series_postings = defaultdict(set)
+        self.rating_postings = defaultdict(set)
+        self.year_postings = defaultdict(set)  # 发行年份 -> 视频路径集合
         self.all_tags = set()
         self.all_actors = set()
         self.all_series = set()
         self.all_ratings = set()
+        self.tag_counts = Counter()
         self.actor_counts = Counter()
+        self.series_counts = Counter()
+        self.rating_counts = Counter()
+        self.actor_releases = defaultdict(Counter)  # 演员 -> 发行日期计数
         self.actor_latest_release = defaultdict(lambda: datetime.min)
         self.actor_rating_sums = defaultdict(int)
         self.actor_rating_counts = defaultdict(int)
-        for root, _, files in os.walk(self.video_dir):
-            for file in files:
-                if file.lower().endswith(VIDEO_EXTENSIONS):
-                    video_path = os.path.join(root, file)
-                    name, tags, actors, series, release, rating, feature = (
-                        self.parse_filename(file)
-                    )
-                    thumbnail = self.find_thumbnail(root, name)
-                    self.videos.append(
-                        (
-                            video_path,
-                            name,
-                            tags,
-                            actors,
-                            series,
-                            release,
-                            rating,
-                            thumbnail,
-                            feature,
-                        )
-                    )
-                    self.all_tags.update(tags)
-                    self.all_actors.update(actors)
-                    self.actor_counts.update(actors)
-                    if series:
-                        self.all_series.add(series)
-                    self.all_ratings.add(rating)
-                    for actor in actors:
-                        if release:
-                            try:
-                                d = datetime.strptime(release, "%Y-%m-%d")
-                                self.actor_latest_release[actor] = max(
-                                    self.actor_latest_release[actor], d
-                                )
-                            except ValueError:
-                                pass
-                        self.actor_rating_sums[actor] += rating
-                        self.actor_rating_counts[actor] += 1
-
-    def parse_filename(self, filename):
-        base, ext = os.path.splitext(filename)
-        match = re.match(
-            r"^(.*?)(?:\[\s*(.*?)\s*\])?(?:\{\s*(.*?)\s*\})?(?:\(\s*(.*?)\s*\))?(?:~\s*(.*?)\s*)?(?:@\s*(\d+)\s*)?(?:%\s*(.*?)\s*)?$",
-            base,
+        for video in self.videos:
+            self.add_video_stats(video, index_text=False)
+
+    @staticmethod
+    def release_date(release):
+        if release:
+            try:
+                if len(release) == 10 and release[4] == release[7] == "-":
+                    # 标准的 YYYY-MM-DD 用 fromisoformat 解析，比 strptime 快一个数量级
+                    return datetime.fromisoformat(release)
+            except ValueError:
+                pass
+            try:
+                return datetime.strptime(release, "%Y-%m-%d")
+            except ValueError:
+                pass
+        return None
+
+    def build_columns(self):
+        # 首次需要时才建立（也在此时导入 NumPy），之后随视频增删维护
+        days = []
+        for video in self.videos:
+            d = self.release_date(video[5])
+            days.append(d.toordinal() if d else 0)
+        self.columns = ColumnStore(self.next_video_seq)
+        self.columns.load(
+            map(self.video_seq.__getitem__, map(itemgetter(0), self.videos)),
+            self.videos,
+            days,
         )
-        if match:
-            name = match.group(1).strip()
-            tags_str = match.group(2)
-            actors_str = match.group(3)
-            series = match.group(4).strip() if match.group(4) else ""
-            release = match.group(5).strip() if match.group(5) else ""
-            rating_str = match.group(6)
-            feature = match.group(7).strip() if match.group(7) else ""
-            tags = [
-                tag.strip()
-                for tag in (tags_str.split(",") if tags_str else [])
-                if tag.strip()
-            ]
-            actors = [
-                actor.strip()
-                for actor in (actors_str.split(",") if actors_str else [])
-                if actor.strip()
-            ]
-            rating = int(rating_str) if rating_str and rating_str.isdigit() else 1
-            rating = max(1, min(5, rating))  # 限制1-5
+
+    def add_video_stats(self, video, index_text=True):
+        path, _, tags, actors, series, release, rating, _, _ = video
+        d = self.release_date(release)
+        for tag in tags:
+            self.tag_postings[tag].add(path)
+        for actor in actors:
+            self.actor_postings[actor].add(path)
+        self.series_postings[series].add(path)
+        self.rating_postings[rating].add(path)
+        if d:
+            self.year_postings[d.year].add(path)
+        field = SEARCH_SEPARATOR.join(self.search_parts(video))
+        self.search_fields[path] = field
+        if index_text and not self.search_index_queue:
+            self.index_search_text(video)
         else:
-            name = base
-            tags = []
-            actors = []
-            series = ""
-            release = ""
-            rating = 1
-            feature = ""
-        return name, tags, actors, series, release, rating, feature
-
-    def find_thumbnail(self, root, name):
-        for ext in (".jpg", ".png"):
-            thumb_path = os.path.join(root + "/cover", f"{name}{ext}")
-            if os.path.exists(thumb_path):
-                return thumb_path
-        return None  # 无封面
+            self.search_index_queue.append(video)  # 排在尚未建完的视频之后
+        if self.columns is not None:
+            self.columns.put(self.video_seq[path], video, d.toordinal() if d else 0)
+        self.tag_counts.update(tags)
+        self.all_tags.update(tags)
+        self.actor_counts.update(actors)
+        self.all_actors.update(actors)
+        if series:
+            self.series_counts[series] += 1
+            self.all_series.add(series)
+        self.rating_counts[rating] += 1
+        self.all_ratings.add(rating)
+        for actor in actors:
+            if d:
+                self.actor_releases[actor][d] += 1
+                self.actor_latest_release[actor] = max(
+                    self.actor_latest_release[actor], d
+                )
+            self.actor_rating_sums[actor] += rating
+            self.actor_rating_counts[actor] += 1
+
+    def remove_video_stats(self, video):
+        path, _, tags, actors, series, release, rating, _, _ = video
+        d = self.release_date(release)
+        field = self.search_fields.pop(path, "")
+        self.remove_fuzzy_terms(video)
+        if self.columns is not None:
+            self.columns.discard(self.video_seq[path])
+        for postings, keys in (
+            (self.trigram_postings, self.trigrams(field)),
+            (self.tag_postings, tags),
+            (self.actor_postings, actors),
+            (self.series_postings, (series,)),
+            (self.rating_postings, (rating,)),
+            (self.year_postings, (d.year,) if d else ()),
+        ):
+            for key in keys:
+                paths = postings.get(key)
+                if paths is not None:
+                    paths.discard(path)
+                    if not paths:
+                        del postings[key]
+        for tag in tags:
+            self.tag_counts[tag] -= 1
+            if self.tag_counts[tag] <= 0:
+                del self.tag_counts[tag]
+                self.all_tags.discard(tag)
+        for actor in actors:
+            self.actor_counts[actor] -= 1
+            if self.actor_counts[actor] <= 0:
+                del self.actor_counts[actor]
+                self.all_actors.discard(actor)
+        if series:
+            self.series_counts[series] -= 1
+            if self.series_counts[series] <= 0:
+                del self.series_counts[series]
+                self.all_series.discard(series)
+        self.rating_counts[rating] -= 1
+        if self.rating_counts[rating] <= 0:
+            del self.rating_counts[rating]
+            self.all_ratings.discard(rating)
+        for actor in actors:
+            if d:
+                releases = self.actor_releases[actor]
+                releases[d] -= 1
+                if releases[d] <= 0:
+                    del releases[d]
+                    # 只有被删除的是最新发行时间时才需要重新求最大值
+                    if d == self.actor_latest_release[actor]:
+                        self.actor_latest_release[actor] = max(
+                            releases, default=datetime.min
+                        )
+            self.actor_rating_sums[actor] -= rating
+            self.actor_rating_counts[actor] -= 1
 
     def display_filters(self):
         # 清空标签、演员、系列、星级帧
@@ -736,23 +3567,10 @@ class VideoBrowser:
         # 标签
         sorted_tags = sorted(self.all_tags)
         self.tag_vars = {}
-        row = 0
-        col = 0
         for tag in sorted_tags:
-            var = tk.BooleanVar()
-            chk = tk.Checkbutton(
-                self.tags_frame,
-                text=tag,
-                variable=var,
-                command=self.apply_filters,
-                bg=self.left_frame_bg,
+            self.add_filter_option(
+                self.tags_frame, self.tag_vars, tag, tag, self.selected_tags
             )
-            chk.grid(row=row, column=col, sticky="w", padx=5, pady=2)
-            self.tag_vars[tag] = var
-            col += 1
-            if col >= 3:
-                col = 0
-                row += 1
 
         # 演员
         sort_option = self.actor_sort_var.get()
@@ -779,68 +3597,83 @@ class VideoBrowser:
                 reverse=True,
             )
         self.actor_vars = {}
-        row = 0
-        col = 0
         for actor in sorted_actors:
-            var = tk.BooleanVar()
-            chk = tk.Checkbutton(
-                self.actors_frame,
-                text=actor,
-                variable=var,
-                command=self.apply_filters,
-                bg=self.left_frame_bg,
+            self.add_filter_option(
+                self.actors_frame, self.actor_vars, actor, actor, self.selected_actors
             )
-            chk.grid(row=row, column=col, sticky="w", padx=5, pady=2)
-            self.actor_vars[actor] = var
-            col += 1
-            if col >= 3:
-                col = 0
-                row += 1
 
         # 系列
         sorted_series = sorted(self.all_series)
         self.series_vars = {}
-        row = 0
-        col = 0
         for series in sorted_series:
-            var = tk.BooleanVar()
-            chk = tk.Checkbutton(
+            self.add_filter_option(
                 self.series_frame,
-                text=series,
-                variable=var,
-                command=self.apply_filters,
-                bg=self.left_frame_bg,
+                self.series_vars,
+                series,
+                series,
+                self.selected_series,
             )
-            chk.grid(row=row, column=col, sticky="w", padx=5, pady=2)
-            self.series_vars[series] = var
-            col += 1
-            if col >= 3:
-                col = 0
-                row += 1
 
         # 星级
         self.rating_vars = {}
-        row = 0
-        col = 0
         for r in range(1, 6):
-            var = tk.BooleanVar()
-            chk = tk.Checkbutton(
+            self.add_filter_option(
                 self.ratings_frame,
-                text=f"{r} 星",
-                variable=var,
-                command=self.apply_filters,
-                bg=self.left_frame_bg,
+                self.rating_vars,
+                r,
+                f"{r} 星",
+                self.selected_ratings,
             )
-            chk.grid(row=row, column=col, sticky="w", padx=5, pady=2)
-            self.rating_vars[r] = var
-            col += 1
-            if col >= 3:
-                col = 0
-                row += 1
 
         # 重新绑定鼠标滚轮，因为显示过滤器可能添加了新部件
         self.bind_mouse_wheel()
 
+    def add_filter_option(self, frame, option_vars, key, text, selected):
+        # 每行三个，接在栏中已有的选项之后
+        var = tk.BooleanVar(value=key in selected)
+        chk = tk.Checkbutton(
+            frame,
+            text=text,
+            variable=var,
+            command=self.apply_filters,
+            bg=self.left_frame_bg,
+        )
+        row, col = divmod(len(option_vars), 3)
+        chk.grid(row=row, column=col, sticky="w", padx=5, pady=2)
+        option_vars[key] = var
+
+    def append_filter_options(self, videos):
+        """扫描中把新视频带来的标签、演员、系列追加到各栏末尾，不重建已有的选项。"""
+        added = False
+        for _, _, tags, actors, series, _, _, _, _ in videos:
+            for tag in tags:
+                if tag not in self.tag_vars:
+                    self.add_filter_option(
+                        self.tags_frame, self.tag_vars, tag, tag, self.selected_tags
+                    )
+                    added = True
+            for actor in actors:
+                if actor not in self.actor_vars:
+                    self.add_filter_option(
+                        self.actors_frame,
+                        self.actor_vars,
+                        actor,
+                        actor,
+                        self.selected_actors,
+                    )
+                    added = True
+            if series and series not in self.series_vars:
+                self.add_filter_option(
+                    self.series_frame,
+                    self.series_vars,
+                    series,
+                    series,
+                    self.selected_series,
+                )
+                added = True
+        if added:
+            self.bind_mouse_wheel()
+
     def save_state(self):
         state = {
             "search_keyword": self.search_keyword,
@@ -859,9 +3692,17 @@ class VideoBrowser:
         self.redo_stack.clear()
 
     def apply_filters(self, save=True):
-        if save:
+        self.cancel_live_search()
+        if save and not self.live_pending:
             self.save_state()
+        self.live_pending = False
+        self.live_keyword = None
+        self.live_paths = None
         self.search_keyword = self.search_entry.get().strip().lower()
+        if self.snapshot is not None:
+            # 显示快照期间库和左侧栏都还没有载入：保留从上次会话恢复的勾选，
+            # open_session 载入后按此时的关键词显示
+            return
         self.selected_tags = {tag for tag, var in self.tag_vars.items() if var.get()}
         self.selected_actors = {
             actor for actor, var in self.actor_vars.items() if var.get()
@@ -870,8 +3711,108 @@ class VideoBrowser:
             series for series, var in self.series_vars.items() if var.get()
         }
         self.selected_ratings = {r for r, var in self.rating_vars.items() if var.get()}
+        if self.fuzzy_results is not None:
+            if self.current_displayed is self.fuzzy_results:
+                self.current_displayed = None  # 上一次的模糊搜索结果
+            self.fuzzy_results = None
+        if (
+            self.fuzzy_search.get()
+            and self.search_keyword
+            and is_keyword_query(self.search_keyword)
+        ):
+            # 模糊搜索在其余筛选条件的结果中按相似度取前若干个，保持相似度顺序显示
+            keyword, self.search_keyword = self.search_keyword, ""
+            candidates = {video[0] for video in self.filter_videos()}
+            self.search_keyword = keyword
+            self.fuzzy_results = self.fuzzy_videos(keyword, candidates)
+            self.current_displayed = self.fuzzy_results
         self.display_videos()
 
+    def on_search_key(self, event=None):
+        keyword = self.search_entry.get().strip().lower()
+        if keyword == self.search_keyword and self.live_search_job is None:
+            return  # 方向键、回车等没有改变关键词
+        if not self.live_pending:
+            self.save_state()  # 一轮输入只保存一次撤销记录
+            self.live_pending = True
+        self.cancel_live_search()
+        self.live_search_job = self.root.after(SEARCH_DEBOUNCE_MS, self.live_search)
+
+    def cancel_live_search(self):
+        # 新的输入使尚未执行的搜索和补全都已过时
+        for job in (self.live_search_job, self.live_settle_job):
+            if job is not None:
+                self.root.after_cancel(job)
+        self.live_search_job = None
+        self.live_settle_job = None
+
+    def live_search(self):
+        """
+        输入停顿后执行的实时搜索。
+        关键词是上一次的延长时，结果只可能在上一次的结果中，只需逐个确认这些视频；
+        网格只渲染首屏，等输入停顿更久后再补全其余结果，避免每次按键都排序和重建全部瓦片。
+        """
+        self.live_search_job = None
+        keyword = self.search_entry.get().strip().lower()
+        if (
+            self.fuzzy_search.get()
+            or self.current_displayed is not None
+            or self.snapshot is not None
+        ):
+            # 这些情况的结果不是按关键词筛选得到的，输入停顿后按常规方式刷新
+            self.live_settle_job = self.root.after(
+                SEARCH_SETTLE_MS, lambda: self.apply_filters(save=False)
+            )
+            return
+        self.search_keyword = keyword
+        if (
+            self.live_keyword
+            and keyword.startswith(self.live_keyword)
+            and is_keyword_query(self.live_keyword)
+            and is_keyword_query(keyword)
+        ):
+            paths = self.search_paths(keyword, self.live_paths)
+            by_path = self.videos_by_path
+            videos = [
+                by_path[path] for path in sorted(paths, key=self.video_seq.__getitem__)
+            ]
+        else:
+            videos = self.filter_videos()
+            paths = {video[0] for video in videos}
+        self.live_keyword = keyword
+        self.live_paths = paths
+        self.live_results = videos
+        self.show_first_screen()
+        self.live_settle_job = self.root.after(
+            SEARCH_SETTLE_MS, self.settle_live_search
+        )
+
+    def show_first_screen(self):
+        # 只渲染一屏瓦片：用堆取出排序后最前的部分，其余结果留到输入停顿后再排序
+        item_width = self.grid_size + 10
+        self.cols = max(1, self.canvas.winfo_width() // item_width)
+        row_height = thumb_size(self.grid_size)[1] + 2 * TILE_GAP
+        rows = self.canvas.winfo_height() // row_height + 1
+        limit = max(self.batch_size, self.cols * rows)
+        self.filtered_videos = self.sort_videos(
+            self.live_results[:], self.sort_var.get(), limit
+        )
+        self.clear_tiles()
+        self.rendered_count = 0
+        self.current_row = 0
+        while self.rendered_count < len(self.filtered_videos):
+            self.load_more_videos()
+        self.canvas.yview_moveto(0)
+
+    def settle_live_search(self):
+        # 输入已停顿：在首屏之后接上其余结果的排序，首屏瓦片保持不动，之后随滚动加载
+        self.live_settle_job = None
+        self.live_pending = False  # 下一轮输入另存一条撤销记录
+        shown = {video[0] for video in self.filtered_videos}
+        rest = [video for video in self.live_results if video[0] not in shown]
+        self.filtered_videos += self.sort_videos(rest, self.sort_var.get())
+        self.schedule_check()
+
     def reset_filters(self):
         self.save_state()
         self.search_entry.delete(0, tk.END)
@@ -962,7 +3903,7 @@ class VideoBrowser:
             self.schedule_check()
 
     def load_more_videos(self):
-        tile_gap = 5
+        tile_gap = TILE_GAP
         tile_bg = "#FFFFFF"
         start = self.rendered_count
         end = min(start + self.batch_size, len(self.filtered_videos))
@@ -998,8 +3939,7 @@ class VideoBrowser:
             # 缩略图（如果启用）
             show_thumb = self.show_thumbnails.get()
             if show_thumb:
-                thumb_width = self.grid_size - 2 * tile_gap
-                thumb_height = int(thumb_width / 1.5)  # 固定比例
+                thumb_width, thumb_height = thumb_size(self.grid_size)
                 if thumbnail:
                     thumb_frame = tk.Frame(
                         frame, width=thumb_width, height=thumb_height, bg=tile_bg
@@ -1009,23 +3949,34 @@ class VideoBrowser:
                     thumb_frame.bind(
                         "<Button-1>", lambda e, p=video_path: self.play_video(p)
                     )
+                    photo = self.photo_cache.get((thumbnail, thumb_width, thumb_height))
+                    preview = None
+                    if not photo:
+                        preview = self.preview_photo(
+                            thumbnail, thumb_width, thumb_height
+                        )
                     loading_label = tk.Label(
-                        thumb_frame, text="加载中...", bg=tile_bg, anchor="center"
+                        thumb_frame,
+                        text="" if photo or preview else "加载中...",
+                        image=photo or preview or "",
+                        bg=tile_bg,
+                        anchor="center",
                     )
+                    loading_label.image = photo or preview
                     loading_label.pack(fill="both", expand=True)
                     loading_label.bind(
                         "<Button-1>", lambda e, p=video_path: self.play_video(p)
                     )
-                    threading.Thread(
-                        target=self.load_thumb_thread,
-                        args=(
+                    if not photo:
+                        self.thumb_pool.submit(
+                            row,
+                            self.load_thumb_thread,
                             thumb_frame,
                             loading_label,
                             thumbnail,
                             thumb_width,
                             thumb_height,
-                        ),
-                    ).start()
+                        )
                 else:
                     thumb_frame = tk.Frame(
                         frame, width=thumb_width, height=thumb_height, bg=tile_bg
@@ -1190,66 +4141,150 @@ class VideoBrowser:
         self.scrollable_frame.update_idletasks()
         self.canvas.configure(scrollregion=self.canvas.bbox("all"))
         self.bind_mouse_wheel()
+        self.update_thumb_viewport()
+
+    def preview_photo(self, path, w, h):
+        # 把低清预览图放大到缩略图尺寸，作为完整封面加载前的占位
+        preview = self.previews.get(path) if self.previews else None
+        if not preview:
+            return None
+        pw, ph, pixels = preview
+        img = Image.frombytes("RGB", (pw, ph), pixels)
+        return ImageTk.PhotoImage(
+            img.resize(fit_size((pw, ph), w, h), Image.Resampling.BILINEAR)
+        )
 
-    def load_thumb_thread(self, thumb_frame, loading_label, path, w, h):
+    def fetch_thumb(self, path, w, h):
+        """在后台线程取得缩略图：优先读磁盘缓存，否则解码封面；封面缺失或损坏时返回 None。"""
+        cache = self.thumb_cache
+        quality = self.config["thumb_quality"]
+        data = cache.get(path, w, h, quality) if cache else None
+        if data is BAD_IMAGE:
+            return None
         try:
-            img = Image.open(path)
-            img.thumbnail((w, h))
-            with io.BytesIO() as bio:
-                img.save(bio, format="PNG")
-                data = bio.getvalue()
-            self.root.after(
-                0, lambda: self.set_thumb_image(thumb_frame, loading_label, data)
-            )
+            if data is None and cache and (w, h) in THUMB_PYRAMID:
+                # 缓存只保存当前尺寸和最大网格尺寸的母版：拖动网格尺寸滑块后，
+                # 新尺寸由母版缩小得到，不再解码原始封面；没用到的尺寸不占缓存。
+                # 母版由最低优先级的后台任务写入，排队任务已多时不持有解码结果，轮到时重新解码
+                top_size = THUMB_PYRAMID[-1]
+                top_data = None
+                if (w, h) != top_size:
+                    top_data = cache.get(path, *top_size, quality)
+                if top_data is None or top_data is BAD_IMAGE:
+                    top = self.decode_cover(path, *top_size, quality)
+                    if (w, h) != top_size:
+                        held = top
+                        if self.thumb_pool.background_pending() >= MAX_PYRAMID_JOBS:
+                            held = None
+                        self.thumb_pool.submit(
+                            None, self.store_top_thread, path, quality, held
+                        )
+                else:
+                    top = to_tk_mode(Image.open(io.BytesIO(top_data)))
+                img = self.scale_thumb(top, w, h, quality)
+                cache.put(path, w, h, quality, encode_thumb(img))
+            elif data is None:
+                img = self.decode_cover(path, w, h, quality)
+                if cache:
+                    cache.put(path, w, h, quality, encode_thumb(img))
+            else:
+                img = to_tk_mode(Image.open(io.BytesIO(data)))
+        except BadCoverError:
+            # 图片损坏：记入负缓存，封面文件未改动前不再重复解码
+            if cache:
+                cache.put_bad(path, w, h, quality)
+            return None
         except Exception:
-            self.root.after(0, lambda: loading_label.config(text="(无封面)"))
+            # 读取失败、进程池被关闭或重建（CancelledError、BrokenProcessPool、
+            # RuntimeError）等与图片本身无关的错误：本次不显示，下次仍会重试
+            return None
+        previews = self.previews
+        if previews and (data is None or not previews.get(path)):
+            previews.put(path, img)
+        return img
+
+    def decode_cover(self, path, w, h, quality):
+        if self.config["decode_backend"] == "process":
+            return self.process_decoder.decode(path, w, h, quality)
+        return decode_cover(path, w, h, quality)
 
-    def set_thumb_image(self, thumb_frame, loading_label, data):
-        photo = ImageTk.PhotoImage(data=data)
+    def load_thumb_thread(self, thumb_frame, loading_label, path, w, h):
+        stamp = cover_stamp(path)  # 先于读取记录，封面在此期间被替换时下次轮询仍能发现
+        img = self.fetch_thumb(path, w, h)
+        if img is None:
+            self.ui.post(self.set_thumb_missing, loading_label)
+            return
+        # 像素在后台线程解码完毕，主线程只需把像素块复制进 PhotoImage
+        self.ui.post(
+            self.set_thumb_image, thumb_frame, loading_label, img, (path, w, h), stamp
+        )
+
+    def prefetch_thumb_thread(self, path, w, h):
+        stamp = cover_stamp(path)
+        img = self.fetch_thumb(path, w, h)
+        if img is not None:
+            self.ui.post(self.store_prefetched, (path, w, h), img, stamp)
+
+    def store_prefetched(self, key, img, stamp):
+        self.photo_cache.put(key, ImageTk.PhotoImage(img), stamp)
+
+    def scale_thumb(self, top, w, h, quality):
+        size = fit_size(top.size, w, h)
+        if size == top.size:
+            return top
+        return top.resize(size, getattr(Image.Resampling, THUMB_QUALITIES[quality][2]))
+
+    def store_top_thread(self, path, quality, top):
+        # top 为 None 时在此重新解码（排队时没有保留解码结果）
+        cache = self.thumb_cache
+        if not cache or cache.contains(path, *THUMB_PYRAMID[-1], quality):
+            return
+        if top is None:
+            top = self.decode_cover(path, *THUMB_PYRAMID[-1], quality)
+        if cache is self.thumb_cache:  # 期间没有切换视频目录
+            cache.put(path, *THUMB_PYRAMID[-1], quality, encode_thumb(top))
+
+    def set_thumb_missing(self, loading_label):
+        if loading_label.winfo_exists():
+            loading_label.config(image="", text="(无封面)")
+            loading_label.image = None
+
+    def set_thumb_image(self, thumb_frame, loading_label, img, key, stamp):
+        photo = ImageTk.PhotoImage(img)
+        self.photo_cache.put(key, photo, stamp)
+        if not loading_label.winfo_exists():
+            return  # 瓦片已被销毁，但解码结果仍可供下次显示使用
         loading_label.config(image=photo, text="")
         loading_label.image = photo
 
-    def display_videos(self):
-        # 清空现有内容
+    def clear_tiles(self):
+        # 清空现有内容，并取消这些瓦片尚未开始的封面解码和预取任务
+        self.thumb_pool.cancel_all()
+        self.prefetched.clear()
+        self.scroll_samples.clear()
         for widget in self.scrollable_frame.winfo_children():
             widget.destroy()
 
-        # 如果有自定义显示列表，使用它
-        if self.current_displayed is not None:
-            self.filtered_videos = self.current_displayed[:]
-        else:
-            # 正常过滤视频
-            self.filtered_videos = []
-            for video in self.videos:
-                _, name, tags, actors, series, release, rating, _, feature = video
-                if self.search_keyword:
-                    match = False
-                    if self.search_keyword in name.lower():
-                        match = True
-                    elif any(self.search_keyword in tag.lower() for tag in tags):
-                        match = True
-                    elif any(self.search_keyword in actor.lower() for actor in actors):
-                        match = True
-                    elif self.search_keyword in series.lower():
-                        match = True
-                    if not match:
-                        continue
-                if self.selected_tags and not self.selected_tags.intersection(tags):
-                    continue
-                if self.selected_actors and not self.selected_actors.intersection(
-                    actors
-                ):
-                    continue
-                if self.selected_series and series not in self.selected_series:
-                    continue
-                if self.selected_ratings and rating not in self.selected_ratings:
-                    continue
-                self.filtered_videos.append(video)
-
-        # 排序
+    def sort_videos(self, videos, sort_option, limit=None):
+        """
+        按排序选项排列视频（会修改传入的列表）。
+        给出 limit 时只返回排在最前的 limit 个：用堆取出，结果与完整排序后的前 limit 个相同，
+        但不必排序全部视频；乱序时为随机抽取。
+        安装了 NumPy 时，日期排序改用列式副本的 argsort，结果相同，省去逐个解析日期；
+        星级和演员数量的键本来就很便宜，逐个查找视频序号反而更慢，仍按元组排序。
+        （整个筛选结果的排序由 filter_videos 在列式副本上完成，这里只处理已有的列表。）
+        """
+        if (
+            NUMPY_AVAILABLE
+            and sort_option in COLUMN_SORTS
+            and COLUMN_SORTS[sort_option][0] == "day"
+            and len(videos) > 1
+        ):
+            order = self.column_order(videos, sort_option)
+            if order is not None:
+                return list(map(videos.__getitem__, order[:limit].tolist()))
         sort_key = None
         reverse = False
-        sort_option = self.sort_var.get()
         if sort_option == "星级降序":
             sort_key = lambda v: v[6]
             reverse = True
@@ -1263,38 +4298,94 @@ class VideoBrowser:
             sort_key = lambda v: len(v[3])
             reverse = False
         elif sort_option == "从新到旧":
-
-            def date_key(v):
-                try:
-                    d = datetime.strptime(v[5], "%Y-%m-%d")
-                except:
-                    d = None
-                if d is None:
-                    return datetime.min
-                return d
-
-            sort_key = date_key
+            sort_key = lambda v: self.release_date(v[5]) or datetime.min
             reverse = True
         elif sort_option == "从旧到新":
-
-            def date_key(v):
-                try:
-                    d = datetime.strptime(v[5], "%Y-%m-%d")
-                except:
-                    d = None
-                if d is None:
-                    return datetime.max
-                return d
-
-            sort_key = date_key
+            sort_key = lambda v: self.release_date(v[5]) or datetime.max
             reverse = False
         elif sort_option == "乱序":
-            random.shuffle(self.filtered_videos)
+            if limit is not None:
+                return random.sample(videos, min(limit, len(videos)))
+            random.shuffle(videos)
         elif sort_option == "倒序":
-            self.filtered_videos.reverse()
+            videos.reverse()
+
+        if sort_key is None:
+            return videos if limit is None else videos[:limit]
+        if limit is None:
+            videos.sort(key=sort_key, reverse=reverse)
+            return videos
+        select = heapq.nlargest if reverse else heapq.nsmallest
+        return select(limit, videos, key=sort_key)
+
+    def sorted_by_columns(self, candidates, sort_option, ranges=(), ratings=()):
+        # 倒排表未筛选时直接在整列上求掩码得到下标，不必逐个查找序号
+        if self.columns is None:
+            self.build_columns()
+        columns = self.columns
+        masks = [columns.mask(term) for term in ranges]
+        if ratings:
+            masks.append(columns.rating_mask(ratings))
+        if candidates is None:
+            mask = columns.alive
+            for m in masks:
+                mask = mask & m
+            ids = np.flatnonzero(mask)
+        else:
+            ids = np.fromiter(
+                map(self.video_seq.__getitem__, candidates), np.int64, len(candidates)
+            )
+            ids.sort()  # 序号顺序即库中的顺序
+            for m in masks:
+                ids = ids[m[ids]]
+        return columns.view(ids[columns.order(ids, sort_option)])
+
+    def column_order(self, videos, sort_option):
+        # 视频排序后的位置；列表中有不在库中的视频（例如已被删除）时返回 None
+        if self.columns is None:
+            self.build_columns()
+        try:
+            ids = np.fromiter(
+                map(self.video_seq.__getitem__, map(itemgetter(0), videos)),
+                np.int64,
+                len(videos),
+            )
+        except KeyError:
+            return None
+        return self.columns.order(ids, sort_option)
+
+    def display_videos(self, keep_scroll=False):
+        if self.snapshot is not None and self.canvas.winfo_width() <= 1:
+            return  # 画布尚未显示，等首次 <Configure> 得到宽度后再绘制快照
+        # 监视到目录变化时原位刷新，保留已渲染的数量和滚动位置
+        if keep_scroll:
+            scroll_top = self.canvas.yview()[0]
+            rendered = self.rendered_count
+        self.clear_tiles()
+
+        sort_option = self.sort_var.get() if self.snapshot is None else "无"
+        if self.snapshot is not None:
+            # 启动时先显示上次的首屏，并回到上次的滚动位置
+            self.filtered_videos = self.snapshot[:]
+            keep_scroll = True
+            scroll_top = self.session.get("scroll", 0.0)
+            rendered = len(self.snapshot)
+        # 如果有自定义显示列表，使用它
+        elif self.current_displayed is not None:
+            self.filtered_videos = self.current_displayed[:]
+            if self.current_displayed is self.fuzzy_results:
+                # 模糊搜索结果按相似度排列；不改动排序选项，关闭模糊搜索后仍按用户的选择排序
+                sort_option = "无"
+        elif NUMPY_AVAILABLE and sort_option in COLUMN_SORTS:
+            # 筛选时直接按列排好序
+            self.filtered_videos = self.filter_videos(sort_option)
+            sort_option = "无"
+        else:
+            # 正常过滤视频
+            self.filtered_videos = self.filter_videos()
 
-        if sort_key:
-            self.filtered_videos.sort(key=sort_key, reverse=reverse)
+        # 排序
+        self.filtered_videos = self.sort_videos(self.filtered_videos, sort_option)
 
         self.gap_color = "#FFE1F2"  # 瓦片间隙颜色（例如浅灰）
         self.canvas.configure(bg=self.gap_color)  # 右侧大画布背景
@@ -1308,6 +4399,17 @@ class VideoBrowser:
         self.rendered_count = 0
         self.current_row = 0
         self.load_more_videos()
+        if self.first_tile_ms is None and self.rendered_count:
+            self.root.after_idle(self.record_first_tile)  # 绘制完成后记录
+            if self.snapshot is not None and not self.session_scheduled:
+                self.session_scheduled = True
+                self.root.after_idle(self.open_session)
+        if keep_scroll:
+            while self.rendered_count < min(rendered, len(self.filtered_videos)):
+                self.load_more_videos()
+            self.canvas.yview_moveto(scroll_top)
+            self.update_thumb_viewport()
+            return
         # 重置滚动到顶部
         self.canvas.yview_moveto(0)
 
@@ -1515,6 +4617,11 @@ class VideoBrowser:
                         os.path.dirname(old_thumbnail), new_name + thumb_ext
                     )
                     os.rename(old_thumbnail, new_thumb_path)
+                    if self.thumb_cache:
+                        self.thumb_cache.invalidate(old_thumbnail)
+                    self.photo_cache.invalidate(old_thumbnail)
+                    if self.previews:
+                        self.previews.invalidate(old_thumbnail)
                 except Exception:
                     pass
             if win:
@@ -1585,7 +4692,32 @@ class VideoBrowser:
             messagebox.showerror("错误", f"无法打开 PotPlayer: {e}")
 
 
+def bench_arg(text):
+    """命令行参数：整数转为 int，"宽x高" 转为 (宽, 高)；已存在的路径和其余参数保持字符串。"""
+    if os.path.exists(text):
+        return text
+    if re.fullmatch(r"\d+", text):
+        return int(text)
+    match = re.fullmatch(r"(\d+)x(\d+)", text)
+    if match:
+        return int(match.group(1)), int(match.group(2))
+    return text
+
+
+BENCHMARKS = {
+    "handoff": bench_thumb_handoff,
+    "decode": bench_decode_backends,
+    "scan": bench_scan,
+    "parse": bench_parse,
+    "columns": bench_columns,
+}
+
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # 打包为 exe 后进程池解码需要
+    # 基准测试：python LocalVideoManager.py --bench <名称> [参数...]
+    if len(sys.argv) > 2 and sys.argv[1] == "--bench":
+        BENCHMARKS[sys.argv[2]](*map(bench_arg, sys.argv[3:]))
+        sys.exit(0)
     root = tk.Tk()
     app = VideoBrowser(root)
     root.mainloop()
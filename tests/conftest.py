@@ -0,0 +1,73 @@
+import os
+import random
+import sys
+
+import pytest
+
+# 测试直接导入仓库根目录下的 LocalVideoManager.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from LocalVideoManager import VideoBrowser
+
+# 随机视频记录的素材：含中日文、希腊字母 σ/ς/Σ、带点的 İ（小写后变成两个字符）等大小写特殊的字符
+WORDS = [
+    "Drama",
+    "drama",
+    "剧情",
+    "校园",
+    "東京",
+    "とうきょう",
+    "ΣΟΦΊΑ",
+    "σοφία",
+    "Σοφίας",
+    "İstanbul",
+    "istanbul",
+    "STRASSE",
+    "Straße",
+    "ABC-123",
+    "abc",
+    "x y",
+]
+
+
+def random_video(rng, index):
+    """随机生成一条视频记录 (路径, 名称, 标签, 演员, 系列, 发行时间, 星级, 封面, 特征码)。"""
+    release = ""
+    if rng.random() < 0.8:
+        release = f"{rng.randint(2015, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+    return (
+        f"/v/{index}.mp4",
+        " ".join(rng.sample(WORDS, rng.randint(1, 3))) + f" {index}",
+        rng.sample(WORDS, rng.randint(0, 3)),
+        rng.sample(WORDS, rng.randint(0, 2)),
+        rng.choice(WORDS + [""] * 4),
+        release,
+        rng.randint(1, 5),
+        None,
+        rng.choice(["", f"ABC-{index}", f"XYZ-{index:03d}"]),
+    )
+
+
+@pytest.fixture
+def videos():
+    rng = random.Random(0)
+    return [random_video(rng, i) for i in range(300)]
+
+
+@pytest.fixture
+def make_browser():
+    return new_browser
+
+
+def new_browser(videos, index=True):
+    """只含筛选、搜索状态的 VideoBrowser（不建立界面）；index 为 False 时搜索索引留在队列中。"""
+    browser = VideoBrowser.__new__(VideoBrowser)
+    browser.set_videos(videos)
+    browser.selected_tags = set()
+    browser.selected_actors = set()
+    browser.selected_series = set()
+    browser.selected_ratings = set()
+    browser.search_keyword = ""
+    if index:
+        browser.build_search_index()
+    return browser
@@ -0,0 +1,163 @@
+import random
+from datetime import datetime
+
+import pytest
+
+from LocalVideoManager import COLUMN_SORTS, NUMPY_AVAILABLE
+
+
+def release_key(default):
+    def key(video):
+        try:
+            return datetime.strptime(video[5], "%Y-%m-%d")
+        except ValueError:
+            return default
+
+    return key
+
+
+# 原来 display_videos 中各排序选项的键和方向
+SORT_KEYS = {
+    "星级降序": (lambda v: v[6], True),
+    "星级升序": (lambda v: v[6], False),
+    "演员数量降序": (lambda v: len(v[3]), True),
+    "演员数量升序": (lambda v: len(v[3]), False),
+    "从新到旧": (release_key(datetime.min), True),
+    "从旧到新": (release_key(datetime.max), False),
+}
+
+
+def linear_filter(videos, tags, actors, series, ratings, keyword):
+    """原来 display_videos 中逐个视频的筛选：同一类条件取并集，不同类取交集。"""
+    result = []
+    for video in videos:
+        _, name, video_tags, video_actors, video_series, _, rating, _, _ = video
+        parts = (name, *video_tags, *video_actors, video_series)
+        if keyword and not any(keyword in part.lower() for part in parts):
+            continue
+        if tags and not tags.intersection(video_tags):
+            continue
+        if actors and not actors.intersection(video_actors):
+            continue
+        if series and video_series not in series:
+            continue
+        if ratings and rating not in ratings:
+            continue
+        result.append(video)
+    return result
+
+
+def selections(videos, count=60):
+    rng = random.Random(3)
+    tags = sorted({tag for video in videos for tag in video[2]})
+    actors = sorted({actor for video in videos for actor in video[3]})
+    series = sorted({video[4] for video in videos})
+    for _ in range(count):
+        yield (
+            set(rng.sample(tags, rng.randint(0, 2))),
+            set(rng.sample(actors, rng.randint(0, 2))),
+            set(rng.sample(series, rng.choice([0, 0, 1, 3]))),
+            set(rng.sample(range(1, 6), rng.randint(0, 2))),
+            rng.choice(["", "", "a", "σ", "東京", "drama", "i̇s", "1"]),
+        )
+
+
+def select(browser, tags, actors, series, ratings, keyword):
+    browser.selected_tags = tags
+    browser.selected_actors = actors
+    browser.selected_series = series
+    browser.selected_ratings = ratings
+    browser.search_keyword = keyword
+
+
+def test_filter_videos_matches_linear_filter(videos, make_browser):
+    browser = make_browser(videos)
+    for selection in selections(videos):
+        select(browser, *selection)
+        assert browser.filter_videos() == linear_filter(videos, *selection)
+
+
+@pytest.mark.skipif(not NUMPY_AVAILABLE, reason="按列排序需要 NumPy")
+@pytest.mark.parametrize("sort_option", COLUMN_SORTS)
+def test_filter_videos_sorted_matches_linear_sort(videos, make_browser, sort_option):
+    browser = make_browser(videos)
+    key, reverse = SORT_KEYS[sort_option]
+    for selection in selections(videos, 20):
+        select(browser, *selection)
+        expected = sorted(linear_filter(videos, *selection), key=key, reverse=reverse)
+        assert list(browser.filter_videos(sort_option)) == expected
+        # 对已有列表排序（例如实时搜索的结果）也应相同
+        result = browser.sort_videos(linear_filter(videos, *selection), sort_option)
+        assert result == expected
+
+
+def index_state(browser):
+    """与视频增删相关的全部索引和统计，去掉增删后留下的空项以便比较。"""
+    actors = browser.all_actors
+    return {
+        "videos": browser.videos,
+        "by_path": browser.videos_by_path,
+        "order": sorted(browser.video_seq, key=browser.video_seq.__getitem__),
+        "search_fields": browser.search_fields,
+        "trigrams": dict(browser.trigram_postings),
+        "fuzzy_terms": browser.fuzzy_terms,
+        "term_grams": dict(browser.term_grams),
+        **{
+            name: dict(getattr(browser, name))
+            for name in (
+                "tag_postings",
+                "actor_postings",
+                "series_postings",
+                "rating_postings",
+                "year_postings",
+                "tag_counts",
+                "actor_counts",
+                "series_counts",
+                "rating_counts",
+            )
+        },
+        "all": (
+            browser.all_tags,
+            browser.all_actors,
+            browser.all_series,
+            browser.all_ratings,
+        ),
+        "actor_releases": {a: +browser.actor_releases[a] for a in actors},
+        "actor_latest": {a: browser.actor_latest_release[a] for a in actors},
+        "actor_ratings": {
+            a: (browser.actor_rating_sums[a], browser.actor_rating_counts[a])
+            for a in actors
+        },
+    }
+
+
+def test_apply_video_changes_matches_fresh_index(videos, make_browser):
+    rng = random.Random(4)
+    browser = make_browser(videos[:200], index=False)
+    if NUMPY_AVAILABLE:
+        browser.build_columns()
+    new_videos = iter(videos[200:])
+    for step in range(1, 31):
+        browser.build_search_index(20)  # 增删时部分视频仍在索引队列中
+        current = browser.videos
+        removed = [video[0] for video in rng.sample(current, rng.randint(0, 5))]
+        # 原路径的视频被改名、改标签等，以及新增的视频
+        upserts = [
+            ((video[0], *rng.choice(videos)[1:]), None)
+            for video in rng.sample(current, rng.randint(0, 5))
+        ]
+        upserts += [(next(new_videos), None) for _ in range(rng.randint(0, 3))]
+        browser.apply_video_changes(upserts, removed)
+
+        fresh = make_browser(browser.videos)
+        for selection in selections(browser.videos, 10):
+            select(browser, *selection)
+            select(fresh, *selection)
+            assert browser.filter_videos() == fresh.filter_videos()
+            if NUMPY_AVAILABLE:
+                assert list(browser.filter_videos("从新到旧")) == list(
+                    fresh.filter_videos("从新到旧")
+                )
+        if step % 10 == 0:
+            browser.build_search_index()
+            assert index_state(browser) == index_state(fresh)
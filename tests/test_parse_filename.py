@@ -0,0 +1,151 @@
+import os
+import random
+import re
+
+import pytest
+
+from LocalVideoManager import parse_filename, parse_filename_cached
+
+# 文件名 -> parse_filename_cached 的结果 (名称, 标签, 演员, 系列, 发行时间, 星级, 特征码)
+CASES = [
+    ("My Video.mp4", ("My Video", (), (), "", "", 1, "")),
+    (
+        "My Video[tag1,tag2]{Actor A,Actor B}(Series)~2020-01-15@4%ABC-123.mp4",
+        (
+            "My Video",
+            ("tag1", "tag2"),
+            ("Actor A", "Actor B"),
+            "Series",
+            "2020-01-15",
+            4,
+            "ABC-123",
+        ),
+    ),
+    (
+        "测试[剧情, 校园 ]{ 東京 }(系列一)~2019-05-01@5%XYZ-001.mkv",
+        ("测试", ("剧情", "校园"), ("東京",), "系列一", "2019-05-01", 5, "XYZ-001"),
+    ),
+    ("Name{Actor}.avi", ("Name", (), ("Actor",), "", "", 1, "")),
+    ("Name(Series)@3.mp4", ("Name", (), (), "Series", "", 3, "")),
+    ("Name@9.mp4", ("Name", (), (), "", "", 5, "")),  # 星级限制在 1-5
+    ("Name@0.mp4", ("Name", (), (), "", "", 1, "")),
+    ("Name@x.mp4", ("Name@x", (), (), "", "", 1, "")),  # 星级只能是数字
+    ("Name@３.mp4", ("Name", (), (), "", "", 3, "")),  # 全角数字
+    ("Name%feat.tar.mp4", ("Name", (), (), "", "", 1, "feat.tar")),
+    ("Name[ , ,a].mp4", ("Name", ("a",), (), "", "", 1, "")),
+    ("Name[unclosed.mp4", ("Name[unclosed", (), (), "", "", 1, "")),
+    ("Name~ 2021-02-03 .mp4", ("Name", (), (), "", "2021-02-03", 1, "")),
+    ("a.b[tag].mp4", ("a.b", ("tag",), (), "", "", 1, "")),
+    ("[tag]{actor}.mp4", ("", ("tag",), ("actor",), "", "", 1, "")),
+    ("Name{b}[a].mp4", ("Name{b}", ("a",), (), "", "", 1, "")),  # 字段乱序
+    ("Name[a][b].mp4", ("Name", ("a][b",), (), "", "", 1, "")),  # 字段重复
+    ("  spaced name  [t].mp4", ("spaced name", ("t",), (), "", "", 1, "")),
+    ("line\nbreak[t]@2.mp4", ("line\nbreak[t]@2", (), (), "", "", 1, "")),
+    ("（完）%", ("（完）", (), (), "", "", 1, "")),
+    ("", ("", (), (), "", "", 1, "")),
+]
+
+
+@pytest.mark.parametrize("filename, expected", CASES)
+def test_parse_filename_cached(filename, expected):
+    assert parse_filename_cached(filename) == expected
+
+
+def test_parse_filename_returns_copies():
+    filename = "Name[a,b]{c}.mp4"
+    tags = parse_filename(filename)[1]
+    tags.append("x")
+    assert parse_filename(filename)[1] == ["a", "b"]
+
+
+def parse_filename_reference(filename):
+    """原始的解析实现（每次经 re.match 查找正则），作为 parse_filename 的对照。"""
+    base, ext = os.path.splitext(filename)
+    match = re.match(
+        r"^(.*?)(?:\[\s*(.*?)\s*\])?(?:\{\s*(.*?)\s*\})?(?:\(\s*(.*?)\s*\))?(?:~\s*(.*?)\s*)?(?:@\s*(\d+)\s*)?(?:%\s*(.*?)\s*)?$",
+        base,
+    )
+    if match:
+        name = match.group(1).strip()
+        tags_str = match.group(2)
+        actors_str = match.group(3)
+        series = match.group(4).strip() if match.group(4) else ""
+        release = match.group(5).strip() if match.group(5) else ""
+        rating_str = match.group(6)
+        feature = match.group(7).strip() if match.group(7) else ""
+        tags = [
+            tag.strip()
+            for tag in (tags_str.split(",") if tags_str else [])
+            if tag.strip()
+        ]
+        actors = [
+            actor.strip()
+            for actor in (actors_str.split(",") if actors_str else [])
+            if actor.strip()
+        ]
+        rating = int(rating_str) if rating_str and rating_str.isdigit() else 1
+        rating = max(1, min(5, rating))  # 限制1-5
+    else:
+        name = base
+        tags = []
+        actors = []
+        series = ""
+        release = ""
+        rating = 1
+        feature = ""
+    return name, tags, actors, series, release, rating, feature
+
+
+def filename_corpus(count, seed=0):
+    """
+    生成测试用文件名：各字段随机出现、缺失、乱序、重复或不闭合，
+    夹杂空白、中日文、全角符号和数字，也包含不带任何字段的普通文件名。
+    """
+    rng = random.Random(seed)
+    words = ["My Video", "测试", "東京", "ABC-123", "a.b", " x ", "", "1080p", "（完）"]
+    junk = [
+        "",
+        " ",
+        "  ",
+        "\t",
+        "\n",
+        ",",
+        ", ,",
+        "０",
+        "中",
+        "]",
+        "}",
+        ")",
+        "~",
+        "@",
+        "%",
+    ]
+    fields = [
+        lambda: f"[{rng.choice(junk)}{rng.choice(words)},{rng.choice(words)}{rng.choice(junk)}]",
+        lambda: f"{{{rng.choice(words)}{rng.choice(junk)},{rng.choice(words)}}}",
+        lambda: f"({rng.choice(junk)}{rng.choice(words)}{rng.choice(junk)})",
+        lambda: f"~{rng.choice(junk)}20{rng.randint(0, 99):02d}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+        lambda: f"@{rng.choice(junk)}{rng.choice(['0', '3', '5', '9', '12', 'x', '３'])}{rng.choice(junk)}",
+        lambda: f"%{rng.choice(junk)}{rng.choice(words)}",
+        lambda: rng.choice("[{(~@%"),  # 不闭合的分隔符
+    ]
+    ext = [".mp4", ".MKV", "", ".avi", ".tar.mp4"]
+    corpus = []
+    for i in range(count):
+        parts = [rng.choice(words) + rng.choice(junk)]
+        if rng.random() < 0.8:
+            chosen = sorted(rng.sample(range(len(fields)), rng.randint(1, 4)))
+            if rng.random() < 0.2:
+                rng.shuffle(chosen)
+            parts.extend(fields[k]() for k in chosen)
+        corpus.append("".join(parts) + rng.choice(junk[:3]) + rng.choice(ext))
+    return corpus
+
+
+def test_matches_reference_implementation():
+    mismatches = [
+        f
+        for f in filename_corpus(20000)
+        if parse_filename(f) != parse_filename_reference(f)
+    ]
+    assert mismatches == []
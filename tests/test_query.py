@@ -0,0 +1,155 @@
+import random
+from datetime import datetime
+
+import pytest
+
+from LocalVideoManager import NUMPY_AVAILABLE, is_keyword_query, parse_query
+
+
+def describe(terms):
+    return [
+        (
+            (t.field, t.negate, t.values, t.low, t.high)
+            if t.field
+            else (t.values, t.negate)
+        )
+        for t in terms
+    ]
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("东京 drama", [(("东京 drama",), False)]),
+        ("-tag:a", [("tag", True, ("a",), None, None)]),
+        (
+            'tag:a tag:b,c -actor:d rating>=4 year:2019..2022 series:"x y" 关键词',
+            [
+                ("tag", False, ("a",), None, None),
+                ("tag", False, ("b", "c"), None, None),
+                ("actor", True, ("d",), None, None),
+                ("rating", False, (), 4, None),
+                ("year", False, (), 2019, 2022),
+                ("series", False, ("x y",), None, None),
+                (("关键词",), False),
+            ],
+        ),
+        (
+            "rating>3 rating<5 year=2020 year:..2010",
+            [
+                ("rating", False, (), 4, None),
+                ("rating", False, (), None, 4),
+                ("year", False, (), 2020, 2020),
+                ("year", False, (), None, 2010),
+            ],
+        ),
+        ('tag:"a,b" -σ', [("tag", False, ("a,b",), None, None), (("σ",), True)]),
+        # 输入到一半的条件暂时忽略
+        ("tag: rating>= year:20x", []),
+    ],
+)
+def test_parse_query(text, expected):
+    assert describe(parse_query(text)) == expected
+
+
+def test_is_keyword_query():
+    assert is_keyword_query("東京")
+    assert not is_keyword_query("tag:a")
+    assert not is_keyword_query("-tag:a 東京")
+
+
+def year(video):
+    try:
+        return datetime.strptime(video[5], "%Y-%m-%d").year
+    except ValueError:
+        return None
+
+
+def term_matches(term, video):
+    """逐个视频判断是否满足一个查询项（不经过倒排表）。"""
+    _, name, tags, actors, series, _, rating, _, _ = video
+    if term.field is None:
+        keyword = term.values[0]
+        hit = any(keyword in part.lower() for part in (name, *tags, *actors, series))
+    elif term.field == "tag":
+        hit = any(tag.lower() in term.values for tag in tags)
+    elif term.field == "actor":
+        hit = any(actor.lower() in term.values for actor in actors)
+    elif term.field == "series":
+        hit = series.lower() in term.values
+    else:
+        value = rating if term.field == "rating" else year(video)
+        hit = value is not None and (
+            (term.low is None or value >= term.low)
+            and (term.high is None or value <= term.high)
+        )
+    return hit != term.negate
+
+
+def linear_query(videos, text):
+    terms = parse_query(text)
+    return [v for v in videos if all(term_matches(t, v) for t in terms)]
+
+
+def queries(videos):
+    rng = random.Random(5)
+    tags = sorted({tag.lower() for video in videos for tag in video[2]})
+    actors = sorted({actor.lower() for video in videos for actor in video[3]})
+    series = sorted({video[4].lower() for video in videos} - {""})
+    fixed = [
+        "drama",
+        "tag:drama -actor:東京 rating>=4 year:2019..2022",
+        'series:"x y" σ',
+        "-tag:剧情 -σ",
+        "rating:2..3 year>=2020 -year:2022",
+        "year<2016",
+        "tag:straße,strasse i̇",
+        "-rating<=5",
+    ]
+    makers = [
+        lambda: "tag:" + ",".join(rng.sample(tags, rng.randint(1, 2))),
+        lambda: "actor:" + ",".join(rng.sample(actors, rng.randint(1, 2))),
+        lambda: f'series:"{rng.choice(series)}"',
+        lambda: f"rating{rng.choice(['>=', '<=', '>', '<', ':'])}{rng.randint(1, 5)}",
+        lambda: f"year:{rng.randint(2015, 2019)}..{rng.randint(2019, 2024)}",
+        lambda: rng.choice(["drama", "σ", "東京", "abc", "i̇st", "1"]),
+    ]
+    for _ in range(150):
+        parts = [rng.choice(makers)() for _ in range(rng.randint(1, 4))]
+        fixed.append(" ".join("-" + p if rng.random() < 0.3 else p for p in parts))
+    return fixed
+
+
+@pytest.mark.parametrize("index", [False, True])
+def test_query_paths_matches_linear_evaluation(videos, make_browser, index):
+    browser = make_browser(videos, index=index)
+    for text in queries(videos):
+        expected = {video[0] for video in linear_query(videos, text)}
+        paths = browser.query_paths(parse_query(text))
+        assert (
+            set(browser.search_fields) if paths is None else paths
+        ) == expected, text
+
+
+def test_query_paths_within_candidates(videos, make_browser):
+    browser = make_browser(videos)
+    rng = random.Random(6)
+    for text in queries(videos):
+        candidates = {video[0] for video in rng.sample(videos, 100)}
+        expected = {v[0] for v in linear_query(videos, text)} & candidates
+        assert browser.query_paths(parse_query(text), set(candidates)) == expected
+
+
+@pytest.mark.parametrize("sort_option", [None, "从新到旧", "星级升序"])
+def test_filter_videos_with_query(videos, make_browser, sort_option):
+    if sort_option and not NUMPY_AVAILABLE:
+        pytest.skip("按列排序需要 NumPy")
+    browser = make_browser(videos)
+    for text in queries(videos):
+        browser.search_keyword = text
+        expected = linear_query(videos, text)
+        result = list(browser.filter_videos(sort_option))
+        if sort_option is not None:
+            # 排序由 test_filter 检查，这里只比较筛选出的视频
+            result.sort(key=videos.index)
+        assert result == expected, text
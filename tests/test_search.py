@@ -0,0 +1,73 @@
+import random
+
+import pytest
+
+
+def linear_search(videos, keyword, candidates=None):
+    """原来的逐字段搜索：名称、标签、演员或系列小写后包含关键词。"""
+    return {
+        path
+        for path, name, tags, actors, series, *_ in videos
+        if (candidates is None or path in candidates)
+        and any(keyword in part.lower() for part in (name, *tags, *actors, series))
+    }
+
+
+def keywords(videos):
+    """各种长度的关键词：字段中截取的子串、特殊大小写字符，以及不会命中的串。"""
+    rng = random.Random(1)
+    found = [
+        "σ",
+        "ς",
+        "σοφ",
+        "ίας",
+        "i̇",
+        "i̇st",
+        "İst".lower(),
+        "ss",
+        "ß",
+        "strasse",
+        "東京",
+        "とうき",
+        "剧情 校",
+        "x y",
+        "abc-1",
+        "zzz",
+        "不存在的词",
+    ]
+    for _ in range(200):
+        video = rng.choice(videos)
+        part = rng.choice([video[1], *video[2], *video[3], video[4]]).lower()
+        if part:
+            start = rng.randrange(len(part))
+            found.append(part[start : start + rng.randint(1, 6)])
+    # 以及完整的字段（含空格、标点）
+    found.extend(tag.lower() for video in videos[:20] for tag in video[2])
+    return found
+
+
+@pytest.mark.parametrize("index", ["none", "partial", "full"])
+def test_search_paths_matches_linear_scan(videos, make_browser, index):
+    browser = make_browser(videos, index=False)
+    if index == "partial":
+        browser.build_search_index(len(videos) // 2)
+    elif index == "full":
+        browser.build_search_index()
+    for keyword in keywords(videos):
+        assert browser.search_paths(keyword) == linear_search(videos, keyword), keyword
+
+
+def test_search_paths_within_candidates(videos, make_browser):
+    browser = make_browser(videos)
+    rng = random.Random(2)
+    for keyword in keywords(videos):
+        candidates = {video[0] for video in rng.sample(videos, 50)}
+        expected = linear_search(videos, keyword, candidates)
+        assert browser.search_paths(keyword, candidates) == expected, keyword
+
+
+def test_search_paths_ignores_feature_code(make_browser):
+    # 特征码不参与关键词搜索（与原来的搜索相同）
+    video = ("/v/a.mp4", "Name", [], [], "", "", 1, None, "QWE-777")
+    browser = make_browser([video])
+    assert browser.search_paths("qwe") == set()